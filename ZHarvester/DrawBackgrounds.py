@@ -11,6 +11,7 @@ import pdb
 import uncertainties as unc
 
 os.sys.path.append(os.path.expandvars('$CMSSW_BASE/src/ZCounting/'))
+from python.utils import load_fit_macro
 
 # turn off graphical output on screen
 ROOT.gROOT.SetBatch(True)
@@ -38,8 +39,7 @@ if __name__ == '__main__':
 
     print("INFO: Loading C marco...")
     # load functions for fitting
-    ROOT.gROOT.LoadMacro(os.path.dirname(os.path.realpath(
-        __file__)) + "/calculateDataEfficiency.C")
+    load_fit_macro()
 
     ROOT.set_massRange(massLo, massHi, massBin)
 
@@ -1,3 +1,5 @@
+# Draw the fit of a measurement from the saved workspace_*.root file, 
+#   e.g. for fits that were performed with --no-plots
 import ROOT
 ROOT.gROOT.SetBatch(True)
 ROOT.gStyle.SetOptStat(0)
@@ -10,9 +12,13 @@ import matplotlib.pyplot as plt
 import argparse
 import pdb
 import os
+import sys
 import matplotlib.gridspec as gridspec
 import matplotlib.ticker as ticker
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from python.utils import load_fit_library
+
 textsize = 16
 markersize = 4
 fmt='png'
@@ -62,8 +68,8 @@ else:
 if not os.path.isdir(args.saveDir):
     os.mkdir(args.saveDir)
 
-# need to load RooCMS shape to read background model
-ROOT.gROOT.LoadMacro(os.path.dirname(os.path.realpath(__file__))+"/RooCMSShape.cc")
+# need to load the custom pdfs to read the signal and background models, from the fit library if it was built
+load_fit_library()
 
 # load input
 f1 = ROOT.TFile(args.workspace,"READ")
@@ -79,8 +85,22 @@ if parts[1] in ["HLT","ID","Sel","Glo","Sta","Trk"]:
     efficiency = parts[1]
     etaRegion = parts[2]
 
-    print("Reading of this input is not supported yet - exit()")
-    exit()
+    # --- load RooDataHist, get each data set and convert to root histograms
+    data = ws.data("dataCombined")
+    dataFail = data.reduce("sample==2")
+    dataPass = data.reduce("sample==1")
+
+    # get parameters
+    eff = ws.arg("eff")
+    c = None
+
+    names = [f"{efficiency}_Pass", f"{efficiency}_Fail"]
+    nS = [ws.arg("NsigPass"), ws.arg("NsigFail")]
+    nB = [ws.arg("NbkgPass"), ws.arg("NbkgFail")]
+    mS = [ws.pdf("signalPass_0"), ws.pdf("signalFail_0")]
+    mB = [ws.pdf("backgroundPass_0"), ws.pdf("backgroundFail_0")]
+    h = [dataPass.createHistogram("m"), dataFail.createHistogram("m")]
+    chi2 = [ws.arg("chi2pass").getVal(), ws.arg("chi2fail").getVal()]
 
 elif parts[1] == "yield":
     # input file is from a fit in a single category
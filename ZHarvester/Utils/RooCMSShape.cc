@@ -22,6 +22,9 @@
 
 #include "RooCMSShape.h"
 
+#include <algorithm>
+#include <complex>
+
 ClassImp(RooCMSShape);
 
 RooCMSShape::RooCMSShape(const char* name,
@@ -36,10 +39,7 @@ RooCMSShape::RooCMSShape(const char* name,
       alpha("alpha", "alpha", this, _alpha),
       beta("beta", "beta", this, _beta),
       gamma("gamma", "gamma", this, _gamma),
-      peak("peak", "peak", this, _peak) {
-          std::cout<<"make RooCMSShape 1"<<std::endl;
-
-      }
+      peak("peak", "peak", this, _peak) {}
 
 RooCMSShape::RooCMSShape(const RooCMSShape& other, const char* name)
     : RooAbsPdf(other, name),
@@ -47,10 +47,7 @@ RooCMSShape::RooCMSShape(const RooCMSShape& other, const char* name)
       alpha("alpha", this, other.alpha),
       beta("beta", this, other.beta),
       gamma("gamma", this, other.gamma),
-      peak("peak", this, other.peak) {
-          std::cout<<"make RooCMSShape 2"<<std::endl;
-
-      }
+      peak("peak", this, other.peak) {}
 
 Double_t RooCMSShape::evaluate() const {
   // ENTER EXPRESSION IN TERMS OF VARIABLE ARGUMENTS HERE
@@ -75,3 +72,64 @@ Double_t RooCMSShape::evaluate() const {
 
   return v * u;
 }
+
+Int_t RooCMSShape::getAnalyticalIntegral(RooArgSet& allVars, RooArgSet& analVars, const char* /*rangeName*/) const {
+  if (matchArgs(allVars, analVars, x))
+    return 1;
+
+  return 0;
+}
+
+Double_t RooCMSShape::decayPrimitive(Double_t xx) const {
+  // primitive of exp(-gamma*(x-peak))
+  return gamma > 0 ? -exp(-gamma * (xx - peak)) / gamma : xx;
+}
+
+Double_t RooCMSShape::primitive(Double_t xx) const {
+  // primitive of erfc(beta*(alpha-x)) * exp(-gamma*(x-peak)), integration by parts gives
+  //   F(x) = -1/gamma * [ exp(-gamma*(x-peak)) * erfc(beta*(alpha-x)) + G(x) ]
+  //   G(x) = exp(gamma^2/(4*beta^2) - gamma*(alpha-peak)) * erfc(z),  z = beta*(x-alpha) + gamma/(2*beta)
+  // for z > 0, G is computed with the scaled complementary error function erfcx(z) = exp(z^2)*erfc(z) to avoid overflows
+  const Double_t a = alpha, b = beta, g = gamma, p = peak;
+
+  if (b <= 0) {
+    // no turn on, erfc(0) = 1
+    return decayPrimitive(xx);
+  }
+
+  const Double_t v = b * (a - xx);
+  if (g < 1e-9) {
+    // no decay, primitive of the error function only
+    return -(v * TMath::Erfc(v) - exp(-v * v) / sqrt(TMath::Pi())) / b;
+  }
+
+  const Double_t z = b * (xx - a) + g / (2 * b);
+  Double_t G = 0;
+  if (z > 0)
+    G = exp(-g * (xx - p) - v * v) * RooMath::faddeeva(std::complex<double>(0., z)).real();
+  else
+    G = exp(g * g / (4 * b * b) - g * (a - p)) * TMath::Erfc(z);
+
+  return -(exp(-g * (xx - p)) * TMath::Erfc(v) + G) / g;
+}
+
+Double_t RooCMSShape::analyticalIntegral(Int_t code, const char* rangeName) const {
+  assert(code == 1);
+
+  const Double_t xmin = x.min(rangeName), xmax = x.max(rangeName);
+  if (beta <= 0)
+    return primitive(xmax) - primitive(xmin);
+
+  // evaluate() takes 2 for (alpha-x)*beta > 5 and 0 for (alpha-x)*beta < -5 instead of the error function,
+  //   the integral is split at these points
+  const Double_t xLo = alpha - 5. / beta, xHi = alpha + 5. / beta;
+  Double_t integral = 0;
+  if (xmin < xLo)
+    integral += 2 * (decayPrimitive(std::min(xmax, xLo)) - decayPrimitive(xmin));
+
+  const Double_t lo = std::max(xmin, xLo), hi = std::min(xmax, xHi);
+  if (lo < hi)
+    integral += primitive(hi) - primitive(lo);
+
+  return integral;
+}
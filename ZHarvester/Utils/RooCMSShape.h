@@ -44,6 +44,9 @@
    inline ~RooCMSShape() override {}
    Double_t evaluate() const override;
 
+   Int_t getAnalyticalIntegral(RooArgSet& allVars, RooArgSet& analVars, const char* rangeName=0) const override;
+   Double_t analyticalIntegral(Int_t code, const char* rangeName=0) const override;
+
    ClassDefOverride(RooCMSShape, 1);
 
  protected:
@@ -52,6 +55,9 @@
    RooRealProxy beta;
    RooRealProxy gamma;
    RooRealProxy peak;
+
+   Double_t decayPrimitive(Double_t x) const;
+   Double_t primitive(Double_t x) const;
  };
 
  #endif
@@ -37,7 +37,6 @@ RooGaussDoubleSidedExp::RooGaussDoubleSidedExp(
     alphaLo("alphaLo","alphaLo",this,_alphaLo),
     alphaHi("alphaHi","alphaHi",this,_alphaHi)
 {
-    std::cout<<"make RooGaussDoubleSidedExp 1"<<std::endl;
 } 
 
 
@@ -53,7 +52,6 @@ RooGaussDoubleSidedExp::RooGaussDoubleSidedExp(
     alphaLo("alphaLo",this,other.alphaLo),
     alphaHi("alphaHi",this,other.alphaHi)
 { 
-    std::cout<<"make RooGaussDoubleSidedExp 2"<<std::endl;
 } 
 
 
@@ -0,0 +1,110 @@
+/*****************************************************************************
+ * Project: ZCounting
+ *
+ * Description:
+ *   Binned template (histogram) convolved with a Gaussian resolution function.
+ *   With the template density d_i in bin i and the bin edges e_k, the pdf is
+ *     f(x) = sum_k (d_k - d_(k-1)) * Phi((x - mean - e_k) / sigma)
+ *   where Phi is the normal cumulative distribution function.
+ *
+ *****************************************************************************/
+
+#include "RooHistConvGauss.h"
+
+#include <algorithm>
+#include <math.h>
+#include "TMath.h"
+
+ClassImp(RooHistConvGauss);
+
+namespace {
+  // edges further away than this number of sigmas contribute with Phi = 0 or 1
+  const Double_t nSigmaWindow = 8.;
+
+  inline Double_t normalCDF(Double_t t) {
+    return 0.5 * TMath::Erfc(-t / TMath::Sqrt2());
+  }
+
+  // primitive of the normal cumulative distribution function
+  inline Double_t normalCDFPrimitive(Double_t t) {
+    return t * normalCDF(t) + exp(-0.5 * t * t) / sqrt(TMath::TwoPi());
+  }
+}
+
+RooHistConvGauss::RooHistConvGauss(const char* name,
+                                   const char* title,
+                                   RooAbsReal& _x,
+                                   RooAbsReal& _mean,
+                                   RooAbsReal& _sigma,
+                                   const TH1& hist)
+    : RooAbsPdf(name, title),
+      x("x", "x", this, _x),
+      mean("mean", "mean", this, _mean),
+      sigma("sigma", "sigma", this, _sigma) {
+
+  const Int_t nBins = hist.GetNbinsX();
+  const Double_t sum = hist.Integral(1, nBins);
+
+  // density of the normalised template in each bin, zero outside of the histogram
+  std::vector<Double_t> density(nBins + 2, 0.);
+  for (Int_t i = 1; i <= nBins; i++) {
+    if (sum > 0)
+      density[i] = std::max(hist.GetBinContent(i), 0.) / (sum * hist.GetBinWidth(i));
+  }
+
+  edges.resize(nBins + 1);
+  steps.resize(nBins + 1);
+  for (Int_t k = 0; k <= nBins; k++) {
+    edges[k] = hist.GetXaxis()->GetBinUpEdge(k);
+    steps[k] = density[k + 1] - density[k];
+  }
+}
+
+RooHistConvGauss::RooHistConvGauss(const RooHistConvGauss& other, const char* name)
+    : RooAbsPdf(other, name),
+      x("x", this, other.x),
+      mean("mean", this, other.mean),
+      sigma("sigma", this, other.sigma),
+      edges(other.edges),
+      steps(other.steps) {}
+
+Double_t RooHistConvGauss::evaluate() const {
+  const Double_t sig = fabs((Double_t)sigma);
+  const Double_t y = x - mean;
+
+  // edges below the window: Phi = 1, the sum of their steps is the density of the bin above them
+  const auto first = std::lower_bound(edges.begin(), edges.end(), y - nSigmaWindow * sig);
+  // edges above the window: Phi = 0
+  const auto last = std::upper_bound(first, edges.end(), y + nSigmaWindow * sig);
+
+  Double_t result = 0;
+  for (auto k = edges.begin(); k != first; ++k)
+    result += steps[k - edges.begin()];
+
+  for (auto k = first; k != last; ++k)
+    result += steps[k - edges.begin()] * normalCDF((y - *k) / sig);
+
+  return std::max(result, 0.);
+}
+
+Int_t RooHistConvGauss::getAnalyticalIntegral(RooArgSet& allVars, RooArgSet& analVars, const char* /*rangeName*/) const {
+  if (matchArgs(allVars, analVars, x))
+    return 1;
+
+  return 0;
+}
+
+Double_t RooHistConvGauss::analyticalIntegral(Int_t code, const char* rangeName) const {
+  assert(code == 1);
+
+  const Double_t sig = fabs((Double_t)sigma);
+  const Double_t yMin = x.min(rangeName) - mean;
+  const Double_t yMax = x.max(rangeName) - mean;
+
+  Double_t result = 0;
+  for (size_t k = 0; k < edges.size(); k++) {
+    result += steps[k] * (normalCDFPrimitive((yMax - edges[k]) / sig) - normalCDFPrimitive((yMin - edges[k]) / sig));
+  }
+
+  return sig * result;
+}
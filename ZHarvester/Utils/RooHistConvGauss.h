@@ -0,0 +1,51 @@
+/*****************************************************************************
+ * Project: ZCounting
+ *
+ * Description:
+ *   Binned template (histogram) convolved with a Gaussian resolution function.
+ *   The convolution of each bin with the Gaussian is a difference of two normal
+ *   cumulative distribution functions, so the pdf and its integral are analytic
+ *   and no FFT of a finely binned cache is needed when the mean or width change.
+ *   The template is taken as constant within each bin.
+ *
+ *****************************************************************************/
+#ifndef ROO_HIST_CONV_GAUSS
+#define ROO_HIST_CONV_GAUSS
+
+#include <vector>
+
+#include "RooAbsPdf.h"
+#include "RooRealProxy.h"
+#include "RooAbsReal.h"
+#include "TH1.h"
+
+class RooHistConvGauss : public RooAbsPdf {
+public:
+  RooHistConvGauss(){};
+  RooHistConvGauss(const char* name,
+                   const char* title,
+                   RooAbsReal& _x,
+                   RooAbsReal& _mean,
+                   RooAbsReal& _sigma,
+                   const TH1& hist);
+
+  RooHistConvGauss(const RooHistConvGauss& other, const char* name=0);
+  inline TObject* clone(const char* newname) const override { return new RooHistConvGauss(*this, newname); }
+  inline ~RooHistConvGauss() override {}
+  Double_t evaluate() const override;
+
+  Int_t getAnalyticalIntegral(RooArgSet& allVars, RooArgSet& analVars, const char* rangeName=0) const override;
+  Double_t analyticalIntegral(Int_t code, const char* rangeName=0) const override;
+
+  ClassDefOverride(RooHistConvGauss, 1);
+
+protected:
+  RooRealProxy x;
+  RooRealProxy mean;
+  RooRealProxy sigma;
+
+  std::vector<Double_t> edges;  // bin edges of the template
+  std::vector<Double_t> steps;  // change of the template density at each bin edge
+};
+
+#endif
@@ -12,6 +12,7 @@
 #include "RooHistPdf.h"
 #include "RooKeysPdf.h"
 #include "RooRealVar.h"
+#include "RooHistConvGauss.h"
 
 
 class CSignalModel
@@ -88,6 +89,16 @@ public:
     RooHistPdf  *histPdf;
 };
 
+class CMCTemplateConvGaussianAnalytic : public CSignalModel
+{
+public:
+    CMCTemplateConvGaussianAnalytic(RooRealVar &m, TH1D* hist, const Bool_t pass, const int ibin);
+    ~CMCTemplateConvGaussianAnalytic();
+    void Reset();
+    RooRealVar  *mean, *sigma;
+    TH1D        *inHist;
+};
+
 class CMCTemplateConvCrystalBall : public CSignalModel
 {
 public:
@@ -315,6 +326,38 @@ CMCTemplateConvGaussian::~CMCTemplateConvGaussian()
     delete histPdf;
 }
 
+//--------------------------------------------------------------------------------------------------
+CMCTemplateConvGaussianAnalytic::CMCTemplateConvGaussianAnalytic(RooRealVar &m, TH1D* hist, const Bool_t pass, const int ibin)
+{
+    char name[10];
+    if(pass) sprintf(name,"%s_%i","Pass",ibin);
+    else     sprintf(name,"%s_%i","Fail",ibin);
+    char vname[50];
+
+    sprintf(vname,"sig_mean%s",name);  mean  = new RooRealVar(vname,vname,0,-2.5,2.5);
+    sprintf(vname,"sig_sigma%s",name); sigma = new RooRealVar(vname,vname,2,0.1,5);
+
+    sprintf(vname,"sig_inHist_%s",hist->GetName());
+    inHist = (TH1D*)hist->Clone(vname);
+
+    // same model as CMCTemplateConvGaussian with the convolution computed analytically per bin
+    sprintf(vname,"signal%s",name);
+    model = new RooHistConvGauss(vname,"MC x Gaus",m,*mean,*sigma,*inHist);
+}
+
+void CMCTemplateConvGaussianAnalytic::Reset(){
+    std::cout<<"CMCTemplateConvGaussianAnalytic::Reset() --- "<<std::endl;
+    mean->setVal(0);
+    sigma->setVal(2);
+}
+
+CMCTemplateConvGaussianAnalytic::~CMCTemplateConvGaussianAnalytic()
+{
+    delete mean;
+    delete sigma;
+    delete inHist;
+}
+
 //--------------------------------------------------------------------------------------------------
 CMCTemplateConvCrystalBall::CMCTemplateConvCrystalBall(RooRealVar &m, TH1D* hist, const Bool_t pass, const int ibin, int intOrder)
 {
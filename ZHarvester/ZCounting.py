@@ -1,13 +1,20 @@
 import logging as log
 import ROOT
 import pandas as pd
+import numpy as np
 import glob
 import os
 import pdb
 import uncertainties as unc
 import gc
+import multiprocessing
 
 from python.utils import writeSummaryCSV, getEra, getFileName, load_input_csv, get_ls_for_next_measurement, getCorrelationIO, to_DateTime
+from python.utils import load_tree_arrays, histogram_by_ls, add_to_histogram, count_by_ls, run_in_processes, load_fit_results, load_fit_macro
+from python.cache import load_cube
+from python.counting import fast_results, load_templates
+from python.manifest import measurement_manifest, manifest_unchanged, update_manifest, fit_code_identity
+from python.files import file_identity
 
 # disable panda warnings when assigning a new column in the dataframe
 pd.options.mode.chained_assignment = None
@@ -16,8 +23,60 @@ pd.options.mode.chained_assignment = None
 ROOT.gROOT.SetBatch(True)
 
 def extract_results(directory, m, cIO):
+    return complete_results(load_results(directory, m), cIO)
+
+def load_results(directory, m):
     log.info(" === Extracting fit results in {0} for {1}".format(directory,m))
-        
+
+    # the scalar results of all fits of a run are taken from the fit results file, 
+    #   the workspaces are only opened for fits without an entry in it
+    res = extract_results_from_store(directory, m)
+    if res is None:
+        res = extract_results_from_workspaces(directory, m)
+
+    return res
+
+def complete_results(res, cIO):
+    # add the correlation factor between inner and outer track and the delivered number of Z bosons
+    if res is None:
+        return None
+
+    res["cIO"] = cIO
+    res["zDel"] = res["zReco"] * cIO**2 / (res["effSel"] * res["effGlo"] * res["effSta"])**2
+
+    return res
+
+def extract_results_from_store(directory, m):
+    store = load_fit_results(directory)
+    
+    if store is None or not all(("I", m, cat) in store.index for cat in ("HLT", "Sel", "Glo", "Sta")):
+        return None
+
+    row = store.loc[("I", m, "HLT")]
+
+    res = {
+        "effHLT": unc.ufloat(row["eff"], row["effErr"]),
+        "cHLT": row["c"],
+        "zReco": unc.ufloat(row["Nsig"], row["NsigErr"]),
+        "NbkgHLTPass": unc.ufloat(row["NbkgPass"], row["NbkgPassErr"]),
+        "NbkgHLTFail": unc.ufloat(row["NbkgFail"], row["NbkgFailErr"]),
+        "chi2HLT": row["chi2"]
+    }
+
+    for cat in ("Sel", "Glo", "Sta"):
+        row = store.loc[("I", m, cat)]
+
+        res.update({
+            "eff"+cat: unc.ufloat(row["eff"], row["effErr"]),
+            "Nsig"+cat: unc.ufloat(row["Nsig"], row["NsigErr"]),
+            "Nbkg"+cat+"Pass": unc.ufloat(row["NbkgPass"], row["NbkgPassErr"]),
+            "Nbkg"+cat+"Fail": unc.ufloat(row["NbkgFail"], row["NbkgFailErr"]),
+            "chi2"+cat: row["chi2"]
+        })
+
+    return res
+
+def extract_results_from_workspaces(directory, m):
     file_yield = directory+"/workspace_I_{0}.root".format(m)
     
     if not os.path.isfile(file_yield):
@@ -99,22 +158,95 @@ def extract_results(directory, m, cIO):
     f.Delete()
     w.Delete()
 
-    res["cIO"] = cIO
-    res["zDel"] = res["zReco"] * cIO**2 / (res["effSel"] * res["effGlo"] * res["effSta"])**2
-
     return res
-        
+
+def lookahead_runs(run, runs, lumiByRun, cumLumiByRun, threshold):
+    # find the upcoming runs that are needed to collect more than `threshold` recorded luminosity,
+    #   returns the last of these runs and if the upcoming runs do not make enough data for a measurement
+    iFirst = int(np.searchsorted(runs, run, side='right'))
+    if iFirst >= len(runs):
+        return run+1, True
+
+    # binary search on the cumulative luminosity of the runs
+    offset = cumLumiByRun[iFirst-1] if iFirst > 0 else 0.
+    iLast = int(np.searchsorted(cumLumiByRun, offset + threshold, side='right'))
+
+    # differences of the cumulative sum are affected by rounding, if they are close to the threshold
+    #   sum up the runs one after another as for the measurement to get the exact same decision
+    tolerance = 1e-9 * max(cumLumiByRun[-1], threshold, 1.)
+    if all(abs(cumLumiByRun[i] - offset - threshold) > tolerance for i in (iLast-1, iLast) if iFirst <= i < len(runs)):
+        if iLast >= len(runs):
+            return runs[-1], True
+        return runs[iLast], False
+
+    lumi = 0
+    for i in range(iFirst, len(runs)):
+        lumi += lumiByRun[i]
+        if lumi > threshold:
+            return runs[i], False
+
+    return runs[-1], True
+
+def fill_histograms_by_ls(fileName, massMin, massMax, massBin, ptCut, npvMin, npvMax, npvBin):
+    # read each tree once and fill the histograms of all lumisections together, 
+    #   returns a dictionary with the histogram name and an array of shape (lumisections, bins) 
+    #   where the row number corresponds to the lumisection number
+    log.info(" === Fill histograms by lumisection from columnar arrays ...")
+
+    file_ = ROOT.TFile(fileName,"READ")
+
+    columns = ["lumiBlock", "mass", "ptTag", "ptProbe", "pass"]
+    categories = [
+        ("HLT", {2: "h_mass_2HLT_Z", 1: "h_mass_1HLT_Z"}),
+        ("Sel", {1: "h_mass_SIT_pass", 0: "h_mass_SIT_fail"}),
+        ("Glo", {1: "h_mass_Glo_pass", 0: "h_mass_Glo_fail"}),
+        ("Sta", {1: "h_mass_Sta_pass", 0: "h_mass_Sta_fail"}),
+    ]
+
+    arrays = {}
+    for treeName, names in categories:
+        arrays[treeName] = load_tree_arrays(file_.Get(treeName), columns + ["nPV"] if treeName == "HLT" else columns)
+
+    file_.Close()
+
+    maxLS = max([a["lumiBlock"].max() for a in arrays.values() if len(a["lumiBlock"]) > 0] + [0])
+    lumisections = np.arange(maxLS+1)
+
+    hists = {}
+    for treeName, names in categories:
+        a = arrays[treeName]
+
+        # number of candidates in each lumisection
+        hists["n_"+treeName] = count_by_ls(a["lumiBlock"], lumisections)
+
+        if treeName == "HLT":
+            hists["h_PV"] = histogram_by_ls(a["lumiBlock"], a["nPV"], lumisections, npvBin, npvMin, npvMax)
+
+        # compare in double precision, as it is done in the TTree::Draw selection
+        mass = a["mass"].astype(np.float64)
+        acceptance = (mass >= massMin) & (mass < massMax) \
+            & (a["ptTag"].astype(np.float64) > ptCut) & (a["ptProbe"].astype(np.float64) > ptCut)
+
+        for passValue, name in names.items():
+            hists[name] = histogram_by_ls(a["lumiBlock"], mass, lumisections, massBin, massMin, massMax,
+                selection=acceptance & (a["pass"] == passValue))
+
+    return hists
+
 
 ################################################################################
 if __name__ == '__main__':
     import argparse
     import os
 
-    cmsswbase = os.environ['CMSSW_BASE']
+    # the local jobs from submit also run without cmsenv
+    cmsswbase = os.environ.get('CMSSW_BASE')
 
     parser = argparse.ArgumentParser()
     parser.add_argument("-b", "--beginRun", help="first run to analyze [%(default)s]", type=int, default=272007)
     parser.add_argument("-e", "--endRun", help="analyze stops when comes to this run [%(default)s]", type=int, default=1000000)
+    parser.add_argument("--runs", help="comma separated list of the runs to analyze within the range, all runs of the range if not given", 
+                        type=str, default=None)
     parser.add_argument("-m", "--measurement", help="Only fit a specific measurement of the run", type=int, default=None)
     parser.add_argument('--mcCorrections', default="default", type=str,
                         help='specify .json file with MC corrections for muon correlations')
@@ -127,7 +259,7 @@ if __name__ == '__main__':
     parser.add_argument("--byLsCSV", help="ByLs csv input generated by testBril.sh",
                         default="default")
     parser.add_argument("--sigTemplates", default="default", type=str,
-        help="Choose one of the options for signal model (MC, MCxGaus, MCxCB, BW, BWxCB, BWxGaus). Default is MCxGaus")
+        help="Choose one of the options for signal model (MC, MCxGaus, MCxGausAnalytic, MCxCB, BW, BWxCB, BWxGaus). Default is MCxGaus")
     parser.add_argument("--bkgTemplates", default="default", type=str,
         help="Choose one of the options for background model (Exp, Quad, QuadPlusExp, CMSShape, Das). Default is CMSShape")
     parser.add_argument('--ptCut', type=float, default=25.,
@@ -142,6 +274,30 @@ if __name__ == '__main__':
                         help='specify whether or not to do an inclusive fit of the specified runs')
     parser.add_argument('--collect', default=False, action="store_true",
                         help='specify whether or not to run the fits or just collect the results')
+    parser.add_argument('--columnar', default=False, action="store_true",
+                        help='read the trees of each run once and fill the histograms of all lumisections in one pass')
+    parser.add_argument('--cacheDir', default=None, type=str,
+                        help='directory to cache the histograms by lumisection of each run (implies --columnar) and the converted byLS csv file')
+    parser.add_argument('-j', '--jobs', default=1, type=int,
+                        help='number of parallel processes, each process handles a different group of runs [%(default)s]')
+    parser.add_argument('--parallelFits', default=False, action="store_true",
+                        help='perform the fits of the four efficiency categories of a measurement at the same time in separate processes')
+    parser.add_argument('--templateCache', default=None, type=str,
+                        help='directory to cache the MC signal templates across measurements and runs')
+    parser.add_argument('--no-plots', default=False, action="store_true",
+                        help='do not draw the fit plots, the chi2 values are computed without drawing; plots can be made later with Plotting/plot_fit.py')
+    parser.add_argument('--no-workspace', default=False, action="store_true",
+                        help='do not write the workspaces of the fits, only the results in fitResults.csv of each run (no plots can be made later)')
+    parser.add_argument('--fullFits', default=False, action="store_true",
+                        help='always perform the full fit attempts with prefits instead of starting with a fast fit of the full model')
+    parser.add_argument('--warmStart', default=False, action="store_true",
+                        help='start each fit from the converged parameters of the previous measurement in the same category')
+    parser.add_argument('--fast', default=False, action="store_true",
+                        help='no RooFit fits, the yields are taken from numpy fits of the MC templates and an exponential background and the efficiencies are computed in closed form (quick look)')
+    parser.add_argument('--fillFit', default=False, action="store_true",
+                        help='fit all measurements of a fill together with shared shape parameters, only the yields and efficiencies float per measurement')
+    parser.add_argument('--refit', default=False, action="store_true",
+                        help='fit all measurements again, also the ones whose inputs and configuration did not change since the last fit')
     parser.add_argument("-o", "--dirOut", help="where to store the output files", default="./")
 
     args = parser.parse_args()
@@ -154,7 +310,10 @@ if __name__ == '__main__':
     # link to resouces
     eosDir           = args.dirDQM
     prefix_dqm="ZCountingAll-V17_02-" #"DQMData/Run {0}/ZCounting/Run summary/Histograms/".format(run)
-    resPath = cmsswbase + "/src/ZCounting/ZHarvester/res/"
+    if cmsswbase:
+        resPath = cmsswbase + "/src/ZCounting/ZHarvester/res/"
+    else:
+        resPath = os.path.dirname(os.path.realpath(__file__)) + "/res/"
     if( args.beginRun >= 272007 and args.beginRun < 278808
         # there is an overlap for 2016 F in runs with pre and post VFP settings
         and args.beginRun not in [278769, 278801, 278802, 278803, 278804, 278805, 278808]
@@ -204,6 +363,10 @@ if __name__ == '__main__':
     byLsCSV          = byLsCSV          if args.byLsCSV       == "default"   else args.byLsCSV
     measurement      = args.measurement
 
+    if args.fillFit and measurement is not None:
+        log.warning(" === A specific measurement is fit on its own, --fillFit has no effect")
+        args.fillFit = False
+
     log.info("----------------------------------")
     log.info("Use eosDir:              {0}".format(eosDir))
     log.info("Use byLsCSV:             {0}".format(byLsCSV))
@@ -226,6 +389,8 @@ if __name__ == '__main__':
         sigModel = 5 # BW, folding with gauss
     elif args.sigTemplates == "MCxCB":
         sigModel = 6 # MC, folding with crystal ball
+    elif args.sigTemplates == "MCxGausAnalytic":
+        sigModel = 8 # MC, analytic folding with gauss
     else:
         log.warning("signal model {0} unknown! exit()".format(args.sigTemplates))
         exit()
@@ -279,11 +444,29 @@ if __name__ == '__main__':
     npvMin_ = 0.5
     npvMax_ = 100.5
 
-    if not args.collect:
+    # configuration of the fits, the fits of a measurement are repeated if it changes (see python/manifest.py)
+    fitConfig = {
+        "macro": fit_code_identity(),
+        "sigModel": sigModel,
+        "bkgModel": bkgModel,
+        "sigTemplates": [sigTemplates, file_identity(sigTemplates)],
+        "mass": [MassMin_, MassMax_, MassBin_],
+        "npv": [npvMin_, npvMax_, npvBin_],
+        "ptCut": args.ptCut,
+        "etaCut": args.etaCut,
+        "year": currentYear,
+        "fullFits": args.fullFits,
+        "warmStart": args.warmStart,
+        "fillFit": args.fillFit
+    }
+
+    def load_macros():
+        """
+        load functions for fitting and set the global configuration, 
+        done once in the main process or in each worker process
+        """
         log.info(" Loading C marco...")
-        # load functions for fitting
-        ROOT.gROOT.LoadMacro(os.path.dirname(os.path.realpath(
-            __file__)) + "/calculateDataEfficiency.C")
+        load_fit_macro()
 
         ROOT.set_massRange(MassMin_, MassMax_, MassBin_)
         ROOT.set_npvRange(npvMin_, npvMax_)
@@ -292,8 +475,31 @@ if __name__ == '__main__':
 
         ROOT.set_ptCut(args.ptCut)
         ROOT.set_etaCut(args.etaCut)
-    
-    byLS_data = load_input_csv(byLS_filename)
+        if args.templateCache is not None:
+            ROOT.set_templateCacheDir(args.templateCache)
+        if args.no_plots:
+            ROOT.set_makePlots(False)
+        if args.no_workspace:
+            ROOT.set_writeWorkspace(False)
+        if args.fullFits:
+            ROOT.set_stagedFits(False)
+        if args.warmStart:
+            ROOT.set_warmStart(True)
+
+    if args.warmStart and args.parallelFits:
+        log.warning(" The fits with --parallelFits are performed in separate processes, --warmStart has no effect")
+
+    fastTemplates = None
+    if args.fast:
+        log.info(" === Fast mode: yields from fits of the MC templates and an exponential background with numpy, no RooFit fits are performed")
+        # the MC templates are read once, the worker processes inherit them
+        fastTemplates = load_templates(sigTemplates, MassMin_, MassMax_, MassBin_, args.ptCut, args.etaCut)
+    elif not args.collect and args.jobs <= 1:
+        load_macros()
+
+    # a job from submit only processes its own runs, not the other runs in its range
+    byLS_data = load_input_csv(byLS_filename, beginRun=args.beginRun, endRun=args.endRun, 
+        runs=None if args.runs is None else args.runs.split(","), cacheDir=args.cacheDir)
 
     #####################################   
 
@@ -315,248 +521,524 @@ if __name__ == '__main__':
     
     byLS_data = byLS_data.loc[(byLS_data['run'] >= int(args.beginRun)) & (byLS_data['run'] < int(args.endRun))]
 
-    recLumi = 0
-    firstRun = 0
-    lastRun = 0
-    df=None
-    results = []
-    mergeNextRun=False
-    log.info(" === Looping over runs... {0} to {1}".format(int(args.beginRun), int(args.endRun)))
-    for run, byLS_run in byLS_data.groupby('run', sort=True):
-        
-        # first and last run of the measurement
-        if firstRun == 0:
-            firstRun = run
-        lastRun = run
+    # recorded luminosity of each run and cumulative sum over the runs, to look ahead to the upcoming runs
+    lumiByRun = byLS_data.groupby('run', sort=True)['recorded(/pb)'].apply(lambda x: sum(x.values))
+    runNumbers = lumiByRun.index.values
+    lumiByRun = lumiByRun.values.tolist()
+    cumLumiByRun = np.cumsum(lumiByRun)
 
-        fill = byLS_run.drop_duplicates('fill')['fill'].values[0]
-        LSlist = byLS_run['ls'].values.tolist()
+    # fill histograms from columnar arrays of all lumisections
+    columnar = args.columnar or args.cacheDir is not None
 
-        log.info(" === Running Fill {0}".format(fill))
-        log.info(" === Running Run {0}".format(run))
-        
+    def find_input_file(run):
+        """
+        return the DQM file with the trees of the run, None if no file or more than one was found
+        """
         eosFile = eosDir+"/"+prefix_dqm+getEra(run)+"*Muon_"+str(run)+"*.root"
         eosFiles = glob.glob(eosFile)
         if len(eosFiles) == 1:
-            eosFile = eosFiles[0]
-        else:
-            log.warning(" === No file or more than one was found! - continue")
-            log.warning(" === Was looking for: {}".format(eosFile))            
-            continue
-        file_ = ROOT.TFile(eosFile,"READ")
+            return eosFiles[0]
 
-        # trees with muon pairs
-        tHLT = file_.Get("HLT")
-        tSel = file_.Get("Sel")
-        tGlo = file_.Get("Glo")
-        tSta = file_.Get("Sta")
+        log.warning(" === No file or more than one was found! - continue")
+        log.warning(" === Was looking for: {}".format(eosFile))            
+        return None
 
-        # histograms need to be in same directory so that they can get filled
-        hPV.SetDirectory(file_)
-        h2HLT.SetDirectory(file_)
-        h1HLT.SetDirectory(file_)
-        
-        hSITpass.SetDirectory(file_)
-        hSITfail.SetDirectory(file_)
+    def count_candidates(item):
+        """
+        number of Z candidates in each lumisection of a run, None if the run has no input file
+        """
+        run, byLS_run = item
+        eosFile = find_input_file(run)
+        if eosFile is None:
+            return None
 
-        hGlopass.SetDirectory(file_)
-        hGlofail.SetDirectory(file_)
-        
-        # hTrkfail.SetDirectory(file_)
-        hStapass.SetDirectory(file_)
-        hStafail.SetDirectory(file_)     
+        LSlist = byLS_run['ls'].values.tolist()
 
+        if args.cacheDir is not None:
+            # the cube is cached and not built again when the run is processed
+            histsByLS = load_cube(eosFile, 
+                lambda: fill_histograms_by_ls(eosFile, MassMin_, MassMax_, MassBin_, args.ptCut, npvMin_, npvMax_, npvBin_),
+                cacheDir=args.cacheDir, mass=[MassMin_, MassMax_, MassBin_], npv=[npvMin_, npvMax_, npvBin_], ptCut=args.ptCut)
+            nCandidates = histsByLS["n_HLT"] + histsByLS["n_Sel"] + histsByLS["n_Sta"]
+            return [int(nCandidates[l]) if l < len(nCandidates) else 0 for l in LSlist]
+
+        file_ = ROOT.TFile(eosFile,"READ")
+        ZCountlist = (count_by_ls(file_.Get("HLT"), LSlist) + count_by_ls(file_.Get("Sel"), LSlist) 
+            + count_by_ls(file_.Get("Sta"), LSlist)).tolist()
+        file_.Close()
+
+        return ZCountlist
+
+    def split_measurements(run, byLS_run, zcounts, byLS_pending=None):
+        """
+        split the lumisections of a run into measurements and decide for each measurement if it is merged with the next run. 
+        This is the only place where these decisions are made, `plan_run_groups` and `process_runs` take them from here. 
+        Yields the measurement number, its lumisections, its byLS data, the byLS data including the measurement continued from the previous runs 
+        (`byLS_pending`) and if it is merged with the next run
+        """
+        LSlist = byLS_run['ls'].values.tolist()
         Lumilist = byLS_run.loc[byLS_run['ls'].isin(LSlist)]['recorded(/pb)'].values.tolist()
-        ZCountlist = [tHLT.GetEntries("lumiBlock=={0}".format(l))
-            + tSel.GetEntries("lumiBlock=={0}".format(l)) 
-            + tSta.GetEntries("lumiBlock=={0}".format(l)) for l in LSlist]
 
-        log.debug(" === Have lumi secion list {0}".format(LSlist))        
-        log.info(" === Looping over measurements...")
         for m, goodLSlist in enumerate(
-            get_ls_for_next_measurement(lumisections=LSlist, luminosities=Lumilist, zcounts=ZCountlist, 
+            get_ls_for_next_measurement(lumisections=LSlist, luminosities=Lumilist, zcounts=zcounts, 
                 lumiPerMeasurement=LumiPerMeasurement)
         ):
-            log.debug(" === Selected lumi section list {0}".format(goodLSlist))
-
-            if measurement is not None and measurement < m:
-                break
-                    
-            # create datafram byLS for measurement
             byLS_m = byLS_run.loc[byLS_run['ls'].isin(goodLSlist)]
-            
-            ### fill histograms
-            file_.cd() # switch to directory where ttrees and histograms are placed
+            byLS_measurement = byLS_m if byLS_pending is None else pd.concat([byLS_pending, byLS_m], sort=False)
 
-            # define acceptance cuts
-            acceptance = " && mass>={0} && mass<{1} && ptTag > {2} && ptProbe > {2}".format(MassMin_, MassMax_, args.ptCut)
+            # check if upcoming runs make enough data for a measurement
+            nextRun, mergeNextRun = lookahead_runs(run, runNumbers, lumiByRun, cumLumiByRun, 0.5 * LumiPerMeasurement)
+            mergeNextRun = nextRun < int(args.endRun) and (
+                mergeNextRun or byLS_measurement['recorded(/pb)'].sum() < 0.5 * LumiPerMeasurement or args.inclusive)
+
+            yield m, goodLSlist, byLS_m, byLS_measurement, mergeNextRun
+
+            byLS_pending = byLS_measurement if mergeNextRun else None
+
+    def plan_run_groups(zcountsByRun):
+        """
+        split the runs into groups that can be processed independently: 
+        a group ends with a run after which the measurement is not merged with the next run
+        (and with --fillFit that is the last run of a fill). 
+        The measurements are taken from `split_measurements` as in `process_runs`, with the Z candidate counts from `zcountsByRun`
+        """
+        groups = [[]]
+        byLS_pending = None
+        mergeNextRun = False
+        fillByRun = byLS_data.groupby('run', sort=True)['fill'].first().values
+        for iRun, (run, byLS_run) in enumerate(byLS_data.groupby('run', sort=True)):
+            groups[-1].append(run)
+
+            if zcountsByRun[run] is None:
+                # no input file, the run is skipped
+                continue
 
-            log.info(" === Fill histograms for measurement {0} ...".format(m))                        
-            for iLS in goodLSlist:
-                    
-                tHLT.Draw("nPV>>+h_PV","lumiBlock=={0}".format(iLS))
-                
-                n2Before = h2HLT.Integral()
-                n1Before = h1HLT.Integral()
+            for m, goodLSlist, byLS_m, byLS_measurement, mergeNextRun in split_measurements(
+                run, byLS_run, list(zcountsByRun[run]), byLS_pending
+            ):
+                byLS_pending = byLS_measurement if mergeNextRun else None
+
+            # with --fillFit the runs of a fill are fit together and stay in the same group
+            sameFill = args.fillFit and iRun+1 < len(fillByRun) and fillByRun[iRun+1] == fillByRun[iRun]
+
+            if not mergeNextRun and not sameFill:
+                groups.append([])
+
+        return [group for group in groups if group]
+
+    def fit_fill(measurements):
+        """
+        simultaneous fit of the measurements of a fill with shared shape parameters, one fit for each category. 
+        If the fill fit of a category does not converge, the measurements are fit one after another
+        """
+        log.info(" === Fill fit of {0} measurements".format(len(measurements)))
+
+        def vector(type_, values):
+            v = ROOT.std.vector(type_)()
+            for value in values:
+                v.push_back(value)
+            return v
+
+        iBins = vector("int", [p["measurement"] for p in measurements])
+        outputDirs = vector("std::string", [p["outSubDir"] for p in measurements])
+        luminosities = vector("double", [p["recLumi"] for p in measurements])
+        hPVs = vector("TH1D*", [p["hists"]["h_PV"] for p in measurements])
+
+        # the templates are made in the output directory of the last measurement
+        ROOT.set_output(measurements[-1]["outSubDir"])
+        # the header of the fit results is written before the fits are started in parallel processes
+        for outSubDir in sorted(set(p["outSubDir"] for p in measurements)):
+            ROOT.initFitResults(outSubDir)
+
+        def fit(effType, namePass, nameFail):
+            passHists = vector("TH1D*", [p["hists"][namePass] for p in measurements])
+            failHists = vector("TH1D*", [p["hists"][nameFail] for p in measurements])
+
+            if ROOT.calculateFillEfficiency(passHists, failHists, hPVs, iBins, outputDirs, luminosities, 
+                effType, "I", sigModel, bkgModel, sigModel, bkgModel, sigTemplates
+            ):
+                return
+
+            log.warning(" === Fill fit for {0} did not converge, fit the measurements one by one".format(effType))
+            for p in measurements:
+                ROOT.set_output(p["outSubDir"])
+                ROOT.set_luminosity(p["recLumi"])
+                hPass, hFail = p["hists"][namePass], p["hists"][nameFail]
+                if effType == "HLT":
+                    ROOT.calculateHLTEfficiencyAndYield(hPass, hFail, p["measurement"], "I", 
+                        sigModel, bkgModel, sigModel, bkgModel, p["hists"]["h_PV"], sigTemplates)
+                else:
+                    ROOT.calculateDataEfficiency(hPass, hFail, p["measurement"], effType, "I", 
+                        sigModel, bkgModel, sigModel, bkgModel, p["hists"]["h_PV"], sigTemplates)
+
+        # the four fits are independent and can run at the same time
+        run_in_processes([
+            lambda: fit("HLT", "h_mass_2HLT_Z", "h_mass_1HLT_Z"),
+            lambda: fit("Sel", "h_mass_SIT_pass", "h_mass_SIT_fail"),
+            lambda: fit("Glo", "h_mass_Glo_pass", "h_mass_Glo_fail"),
+            lambda: fit("Sta", "h_mass_Sta_pass", "h_mass_Sta_fail")
+        ], parallel=args.parallelFits)
+
+        # remove the histogram templates, not needed anymore
+        for outSubDir in set(p["outSubDir"] for p in measurements):
+            os.system("rm {0}/histTemplates_*".format(outSubDir))
+
+    def process_runs(runs):
+        """
+        generator that fills the histograms and performs the fits for the given runs, 
+        yields the run number and list of results each time a per run csv file is to be written
+        """
+        recLumi = 0
+        firstRun = 0
+        lastRun = 0
+        df=None
+        results = []
+        mergeNextRun=False
+
+        # with --fillFit the measurements of a fill are kept until the fill is complete, 
+        #   the results are extracted after the fill fit and the per run results are yielded afterwards
+        pendingFits = []
+        pendingRuns = []
+        pendingFill = None
+
+        def complete_fill():
+            if pendingFits:
+                fit_fill(pendingFits)
+
+            for p in pendingFits:
+                res = extract_results(p["outSubDir"], p["measurement"], p["cIO"])
+                # the results are filled into the dictionary that is already in the per run results
+                if res:
+                    update_manifest(p["outSubDir"], p["measurement"], p["manifest"])
+                    res.update(p["result"])
+                    p["result"].update(res)
+                else:
+                    log.info(" === No result for measurement {0} in {1}".format(p["measurement"], p["outSubDir"]))
+                    p["result"].clear()
+
+            for run_, results_ in pendingRuns:
+                results_ = [result for result in results_ if result]
+                if results_:
+                    yield run_, results_
+
+            del pendingFits[:]
+            del pendingRuns[:]
+
+        for run, byLS_run in byLS_data.loc[byLS_data['run'].isin(runs)].groupby('run', sort=True):
+        
+            # first and last run of the measurement
+            if firstRun == 0:
+                firstRun = run
+            lastRun = run
 
-                tHLT.Draw("mass>>+h_mass_2HLT_Z",  "pass==2 && lumiBlock=={0} {1}".format(iLS, acceptance))
-                tHLT.Draw("mass>>+h_mass_1HLT_Z",  "pass==1 && lumiBlock=={0} {1}".format(iLS, acceptance))
-                
-                tSel.Draw("mass>>+h_mass_SIT_pass","pass==1 && lumiBlock=={0} {1}".format(iLS, acceptance))                
-                tSel.Draw("mass>>+h_mass_SIT_fail","pass==0 && lumiBlock=={0} {1}".format(iLS, acceptance))                
+            fill = byLS_run.drop_duplicates('fill')['fill'].values[0]
 
-                tGlo.Draw("mass>>+h_mass_Glo_pass","pass==1 && lumiBlock=={0} {1}".format(iLS, acceptance))                
-                tGlo.Draw("mass>>+h_mass_Glo_fail","pass==0 && lumiBlock=={0} {1}".format(iLS, acceptance))                
+            if args.fillFit and fill != pendingFill:
+                for res in complete_fill():
+                    yield res
+                pendingFill = fill
+            LSlist = byLS_run['ls'].values.tolist()
 
-                tSta.Draw("mass>>+h_mass_Sta_pass","pass==1 && lumiBlock=={0} {1}".format(iLS, acceptance))   
-                tSta.Draw("mass>>+h_mass_Sta_fail","pass==0 && lumiBlock=={0} {1}".format(iLS, acceptance))   
-                             
-                n2After = h2HLT.Integral()
-                n1After = h1HLT.Integral()
-                
-                # store the number of 1hlt and 2hlt events in each lumisection
-                n2 = n2After - n2Before
-                n1 = n1After - n1Before
+            log.info(" === Running Fill {0}".format(fill))
+            log.info(" === Running Run {0}".format(run))
+        
+            eosFile = find_input_file(run)
+            if eosFile is None:
+                continue
+            if columnar:
+                # histograms of all lumisections, filled from columnar arrays or taken from the cache
+                histsByLS = load_cube(eosFile, 
+                    lambda: fill_histograms_by_ls(eosFile, MassMin_, MassMax_, MassBin_, args.ptCut, npvMin_, npvMax_, npvBin_),
+                    cacheDir=args.cacheDir, mass=[MassMin_, MassMax_, MassBin_], npv=[npvMin_, npvMax_, npvBin_], ptCut=args.ptCut)
+                nCandidates = histsByLS["n_HLT"] + histsByLS["n_Sel"] + histsByLS["n_Sta"]
+                ZCountlist = [int(nCandidates[l]) if l < len(nCandidates) else 0 for l in LSlist]
+            else:
+                file_ = ROOT.TFile(eosFile,"READ")
+
+                # trees with muon pairs
+                tHLT = file_.Get("HLT")
+                tSel = file_.Get("Sel")
+                tGlo = file_.Get("Glo")
+                tSta = file_.Get("Sta")
+
+                # histograms need to be in same directory so that they can get filled
+                hPV.SetDirectory(file_)
+                h2HLT.SetDirectory(file_)
+                h1HLT.SetDirectory(file_)
+        
+                hSITpass.SetDirectory(file_)
+                hSITfail.SetDirectory(file_)
 
-                byLS_m.loc[byLS_m['ls'] == iLS, 'N2HLT'] = n2
-                byLS_m.loc[byLS_m['ls'] == iLS, 'N1HLT'] = n1                    
+                hGlopass.SetDirectory(file_)
+                hGlofail.SetDirectory(file_)
+        
+                # hTrkfail.SetDirectory(file_)
+                hStapass.SetDirectory(file_)
+                hStafail.SetDirectory(file_)     
 
-            if df is None:
-                df = byLS_m
-            else:
-                df = df.append(byLS_m, sort=False)
+                ZCountlist = (count_by_ls(tHLT, LSlist) + count_by_ls(tSel, LSlist) + count_by_ls(tSta, LSlist)).tolist()
+
+            log.debug(" === Have lumi secion list {0}".format(LSlist))        
+            log.info(" === Looping over measurements...")
+            # the merging with the next run and the manifest only depend on the byLS data and the input files, 
+            #   they are checked before the histograms are filled
+            for m, goodLSlist, byLS_m, byLS_measurement, mergeNextRun in split_measurements(run, byLS_run, ZCountlist, df):
+                log.debug(" === Selected lumi section list {0}".format(goodLSlist))
+
+                if measurement is not None and measurement < m:
+                    break
+
+                if firstRun != lastRun:
+                    outSubDir = outDir + "Run{0}to{1}".format(firstRun,lastRun)
+                else:
+                    outSubDir = outDir + "Run{0}/".format(run)
+
+                # the stored fit results are used if the inputs and the configuration did not change since the last fit,
+                #   only the pileup histogram is filled then for the correlation factor between inner and outer track
+                manifest = None
+                stored = None
+                if not mergeNextRun and not args.collect and not args.fast and (measurement is None or measurement == m):
+                    manifest = measurement_manifest([find_input_file(r) for r in byLS_measurement['run'].unique()], byLS_measurement, fitConfig)
+                    if not args.refit and manifest_unchanged(outSubDir, m, manifest):
+                        stored = load_results(outSubDir, m)
+                        if stored is None:
+                            log.warning(" === Inputs of measurement {0} unchanged but its fit results are missing, fit again".format(m))
+                        else:
+                            log.info(" === Inputs of measurement {0} unchanged, use the stored fit results".format(m))
             
-            recLumi = df['recorded(/pb)'].sum()
+                ### fill histograms
+                log.info(" === Fill histograms for measurement {0} ...".format(m))                        
+                if columnar:
+                    # sum up the histograms of the selected lumisections, an empty measurement leaves the histograms empty as with TTree::Draw
+                    rows = np.asarray(goodLSlist, dtype=np.int64)
+                    rows = rows[rows < len(histsByLS["h_PV"])]
+                    for hist in (hPV,) if stored else (hPV, h2HLT, h1HLT, hSITpass, hSITfail, hGlopass, hGlofail, hStapass, hStafail):
+                        add_to_histogram(hist, histsByLS[hist.GetName()][rows].sum(axis=0))
+
+                    # store the number of 1hlt and 2hlt events in each lumisection
+                    n2 = histsByLS["h_mass_2HLT_Z"][rows, 1:-1].sum(axis=1)
+                    n1 = histsByLS["h_mass_1HLT_Z"][rows, 1:-1].sum(axis=1)
+                    byLS_m['N2HLT'] = byLS_m['ls'].map(dict(zip(rows, n2))).fillna(0.)
+                    byLS_m['N1HLT'] = byLS_m['ls'].map(dict(zip(rows, n1))).fillna(0.)
+                else:
+                    file_.cd() # switch to directory where ttrees and histograms are placed
+
+                    # define acceptance cuts
+                    acceptance = " && mass>={0} && mass<{1} && ptTag > {2} && ptProbe > {2}".format(MassMin_, MassMax_, args.ptCut)
+
+                    for iLS in goodLSlist:
+                    
+                        tHLT.Draw("nPV>>+h_PV","lumiBlock=={0}".format(iLS))
 
-            log.info(" === Have now recorded lumi = {0}".format(recLumi))            
-            log.info(" === Have now {0} | {1} events".format(df['N2HLT'].sum(), h2HLT.Integral()))
-            log.info(" === Histograms filled ...")  
+                        if stored:
+                            continue
             
-            # check if upcoming runs make enough data for a measurement
-            lumi=0
-            mergeNextRun=True
-            nextRun = run+1
-            for r, dr in byLS_data.groupby('run'):
-                if r <= run or r >= int(args.endRun):
-                    continue
-                # if getFileName(eosDir, r) is None: # check if file of next run exists
-                #     continue
-                nextRun = r
-                LS = dr['ls'].values.tolist()
-                lumi += sum(dr.loc[dr['ls'].isin(LS)]['recorded(/pb)'].values)
-                if lumi > 0.5 * LumiPerMeasurement:
-                    mergeNextRun = False
-                    break
+                        n2Before = h2HLT.Integral()
+                        n1Before = h1HLT.Integral()
+
+                        tHLT.Draw("mass>>+h_mass_2HLT_Z",  "pass==2 && lumiBlock=={0} {1}".format(iLS, acceptance))
+                        tHLT.Draw("mass>>+h_mass_1HLT_Z",  "pass==1 && lumiBlock=={0} {1}".format(iLS, acceptance))
             
-            mergeNextRun = nextRun < int(args.endRun) and (mergeNextRun or recLumi < 0.5 * LumiPerMeasurement or args.inclusive)            
+                        tSel.Draw("mass>>+h_mass_SIT_pass","pass==1 && lumiBlock=={0} {1}".format(iLS, acceptance))                
+                        tSel.Draw("mass>>+h_mass_SIT_fail","pass==0 && lumiBlock=={0} {1}".format(iLS, acceptance))                
 
-            if mergeNextRun:
-                log.info(" === Merge with next run ... ")
-                continue
+                        tGlo.Draw("mass>>+h_mass_Glo_pass","pass==1 && lumiBlock=={0} {1}".format(iLS, acceptance))                
+                        tGlo.Draw("mass>>+h_mass_Glo_fail","pass==0 && lumiBlock=={0} {1}".format(iLS, acceptance))                
+
+                        tSta.Draw("mass>>+h_mass_Sta_pass","pass==1 && lumiBlock=={0} {1}".format(iLS, acceptance))   
+                        tSta.Draw("mass>>+h_mass_Sta_fail","pass==0 && lumiBlock=={0} {1}".format(iLS, acceptance))   
+                         
+                        n2After = h2HLT.Integral()
+                        n1After = h1HLT.Integral()
             
-            if firstRun != lastRun:
-                outSubDir = outDir + "Run{0}to{1}".format(firstRun,lastRun)
-            else:
-                outSubDir = outDir + "Run{0}/".format(run)
+                        # store the number of 1hlt and 2hlt events in each lumisection
+                        n2 = n2After - n2Before
+                        n1 = n1After - n1Before
+
+                        byLS_m.loc[byLS_m['ls'] == iLS, 'N2HLT'] = n2
+                        byLS_m.loc[byLS_m['ls'] == iLS, 'N1HLT'] = n1                    
+
+                if df is None:
+                    df = byLS_m
+                else:
+                    df = df.append(byLS_m, sort=False)
+            
+                recLumi = df['recorded(/pb)'].sum()
+
+                log.info(" === Have now recorded lumi = {0}".format(recLumi))            
+                if not stored:
+                    log.info(" === Have now {0} | {1} events".format(df['N2HLT'].sum(), h2HLT.Integral()))
+                log.info(" === Histograms filled ...")  
+            
+                if mergeNextRun:
+                    log.info(" === Merge with next run ... ")
+                    continue
+
+                log.debug(" === Running measurement {0}".format(m))
+
+                cIO = getCorrelationIO(hPV, correlationsIO)
 
-            log.debug(" === Running measurement {0}".format(m))
+                reused = complete_results(stored, cIO)
 
-            if not args.collect:
+                if not args.collect and not args.fast and reused is None:
                 
-                if measurement is None or measurement == m:
-                    # skip the fit if we look for another measurement
+                    if measurement is None or measurement == m:
+                        # skip the fit if we look for another measurement
                 
-                    if not os.path.isdir(outSubDir):
-                        os.mkdir(outSubDir)
-                    
-                    ROOT.set_output(outSubDir)
-                    ROOT.set_luminosity(recLumi)
+                        if not os.path.isdir(outSubDir):
+                            os.mkdir(outSubDir)
+
+                    if args.fillFit:
+                        # keep copies of the histograms for the fill fit
+                        hists = {}
+                        for hist in (hPV, h2HLT, h1HLT, hSITpass, hSITfail, hGlopass, hGlofail, hStapass, hStafail):
+                            hists[hist.GetName()] = hist.Clone("{0}_{1}".format(hist.GetName(), len(pendingFits)))
+                            hists[hist.GetName()].SetDirectory(0)
+
+                        pendingFits.append({"measurement": m, "outSubDir": outSubDir, "recLumi": recLumi, "hists": hists, 
+                            "manifest": manifest})
+
+                    elif measurement is None or measurement == m:
+                        ROOT.set_output(outSubDir)
+                        ROOT.set_luminosity(recLumi)
+                        ROOT.initFitResults(outSubDir)
     
-                    ROOT.calculateHLTEfficiencyAndYield(h2HLT, h1HLT, m, "I", sigModel, bkgModel, sigModel, bkgModel, hPV, sigTemplates )
-                    ROOT.calculateDataEfficiency(hSITpass, hSITfail, m, "Sel", "I", sigModel, bkgModel, sigModel, bkgModel, hPV, sigTemplates )
-                    ROOT.calculateDataEfficiency(hGlopass, hGlofail, m, "Glo", "I", sigModel, bkgModel, sigModel, bkgModel, hPV, sigTemplates )
-                    ROOT.calculateDataEfficiency(hStapass, hStafail, m, "Sta", "I", sigModel, bkgModel, sigModel, bkgModel, hPV, sigTemplates )
+                        # the four fits are independent and can run at the same time
+                        run_in_processes([
+                            lambda: ROOT.calculateHLTEfficiencyAndYield(h2HLT, h1HLT, m, "I", sigModel, bkgModel, sigModel, bkgModel, hPV, sigTemplates ),
+                            lambda: ROOT.calculateDataEfficiency(hSITpass, hSITfail, m, "Sel", "I", sigModel, bkgModel, sigModel, bkgModel, hPV, sigTemplates ),
+                            lambda: ROOT.calculateDataEfficiency(hGlopass, hGlofail, m, "Glo", "I", sigModel, bkgModel, sigModel, bkgModel, hPV, sigTemplates ),
+                            lambda: ROOT.calculateDataEfficiency(hStapass, hStafail, m, "Sta", "I", sigModel, bkgModel, sigModel, bkgModel, hPV, sigTemplates )
+                        ], parallel=args.parallelFits)
     
-                    # ROOT.calculateAll(h2HLT, h1HLT, hSITfail, hTrkfail, hStafail, 
-                    #     m, "I", sigModel, bkgModel, hPV, sigTemplates)
-            
-                    # remove the histogram templates, not needed anymore
-                    os.system("rm {0}/histTemplates_*".format(outSubDir))
-
-            cIO = getCorrelationIO(hPV, correlationsIO)
-            
+                        # ROOT.calculateAll(h2HLT, h1HLT, hSITfail, hTrkfail, hStafail, 
+                        #     m, "I", sigModel, bkgModel, hPV, sigTemplates)
             
-            result = extract_results(outSubDir, m, cIO)
+                        # remove the histogram templates, not needed anymore
+                        os.system("rm {0}/histTemplates_*".format(outSubDir))
+
+                if args.fast:
+                    result = fast_results(h2HLT, h1HLT, hSITpass, hSITfail, hGlopass, hGlofail, hStapass, hStafail, cIO, 
+                        templates=fastTemplates, hPV=hPV)
+                elif reused is not None:
+                    result = reused
+                elif args.fillFit and not args.collect:
+                    # the fit results are added after the fill fit
+                    result = {}
+                    pendingFits[-1].update({"cIO": cIO, "result": result})
+                else:
+                    result = extract_results(outSubDir, m, cIO)
+                    if result is not None and manifest is not None:
+                        update_manifest(outSubDir, m, manifest)
             
-            if result:
-                df['time'] = df['time'].apply(lambda x: to_DateTime(x, string_format = "mm/dd/yy"))
-
-                result.update({
-                    "fill": fill,
-                    "run": run,
-                    "measurement": m,
-                    "tdate_begin": min(df['time']).strftime("%y/%m/%d %H:%M:%S"),
-                    "tdate_end": max(df['time']).strftime("%y/%m/%d %H:%M:%S"),
-                    "lumiDel": df['delivered(/pb)'].sum(),
-                    "lumiRec": df['recorded(/pb)'].sum(),
-                    "timewindow": len(df) * secPerLS,
-                    "pileUp": df['avgpu'].mean()
-                })
+                if result is not None:
+                    df['time'] = df['time'].apply(lambda x: to_DateTime(x, string_format = "mm/dd/yy"))
+
+                    result.update({
+                        "fill": fill,
+                        "run": run,
+                        "measurement": m,
+                        "tdate_begin": min(df['time']).strftime("%y/%m/%d %H:%M:%S"),
+                        "tdate_end": max(df['time']).strftime("%y/%m/%d %H:%M:%S"),
+                        "lumiDel": df['delivered(/pb)'].sum(),
+                        "lumiRec": df['recorded(/pb)'].sum(),
+                        "timewindow": len(df) * secPerLS,
+                        "pileUp": df['avgpu'].mean()
+                    })
             
-                results.append(result)
-            else:
-                log.info(" === No result - continue")
+                    results.append(result)
+                else:
+                    log.info(" === No result - continue")
             
-            # prepare for next measurement
-            df=None
+                # prepare for next measurement
+                df=None
 
-            # clean the histograms for the next measurement
-            h2HLT.Reset()
-            h1HLT.Reset()
+                # clean the histograms for the next measurement
+                h2HLT.Reset()
+                h1HLT.Reset()
 
-            hSITpass.Reset()
-            hSITfail.Reset()
+                hSITpass.Reset()
+                hSITfail.Reset()
 
-            hGlopass.Reset()
-            hGlofail.Reset()
+                hGlopass.Reset()
+                hGlofail.Reset()
 
-            # hTrkfail.Reset()
-            hStapass.Reset()
-            hStafail.Reset()
+                # hTrkfail.Reset()
+                hStapass.Reset()
+                hStafail.Reset()
 
-            hPV.Reset() 
+                hPV.Reset() 
 
-        ### prepare for next run
-        # keep histograms
-        hPV.SetDirectory(0)
-        h2HLT.SetDirectory(0)
-        h1HLT.SetDirectory(0)
+            ### prepare for next run
+            # keep histograms
+            hPV.SetDirectory(0)
+            h2HLT.SetDirectory(0)
+            h1HLT.SetDirectory(0)
         
-        hSITpass.SetDirectory(0)
-        hSITfail.SetDirectory(0)
+            hSITpass.SetDirectory(0)
+            hSITfail.SetDirectory(0)
 
-        hGlopass.SetDirectory(0)
-        hGlofail.SetDirectory(0)
+            hGlopass.SetDirectory(0)
+            hGlofail.SetDirectory(0)
         
-        # hTrkfail.SetDirectory(0)
-        hStapass.SetDirectory(0)
-        hStafail.SetDirectory(0)    
+            # hTrkfail.SetDirectory(0)
+            hStapass.SetDirectory(0)
+            hStafail.SetDirectory(0)    
 
-        file_.Close()
+            if not columnar:
+                file_.Close()
 
-        if mergeNextRun:
-            continue
+            if mergeNextRun:
+                continue
         
-        if measurement is None or measurement == m:
-            ## Write per measurement csv file - one per run
-            log.info(" === Writing per Run CSV file")
-            results = pd.concat([pd.DataFrame([result]) for result in results], ignore_index=True, sort=False)
+            if args.fillFit:
+                pendingRuns.append((run, results))
+            elif measurement is None or measurement == m:
+                # the per run csv file is written by the main process
+                yield run, results
 
-            with open(outCSVDir + '/csvfile{0}.csv'.format(run), 'w') as file:
-                results.to_csv(file, index=False)
+            firstRun = 0
+            results = []
 
-        firstRun = 0
-        results = []
+        if args.fillFit:
+            for res in complete_fill():
+                yield res
+
+
+    def process_group(runs):
+        return list(process_runs(runs))
+
+    log.info(" === Looping over runs... {0} to {1}".format(int(args.beginRun), int(args.endRun)))
+    if args.jobs > 1 and measurement is None:
+        # spread independent groups of runs over worker processes, each worker loads the macros once
+        pool = multiprocessing.get_context("fork").Pool(args.jobs, 
+            initializer=None if args.collect or args.fast else load_macros)
+
+        runItems = list(byLS_data.groupby('run', sort=True))
+        log.info(" === Count Z candidates of {0} runs to group the runs...".format(len(runItems)))
+        zcountsByRun = dict(zip([run for run, _ in runItems], pool.map(count_candidates, runItems)))
+
+        groups = plan_run_groups(zcountsByRun)
+        log.info(" === Process {0} groups of runs with {1} processes".format(len(groups), args.jobs))
+        resultsByGroup = (res for resGroup in pool.imap(process_group, groups) for res in resGroup)
+    else:
+        if args.jobs > 1:
+            log.warning(" === Only one process can be used for a specific measurement")
+            if not args.collect and not args.fast:
+                load_macros()
+        resultsByGroup = process_runs(byLS_data['run'].unique())
+
+    for run, results in resultsByGroup:
+        ## Write per measurement csv file - one per run
+        log.info(" === Writing per Run CSV file")
+        results = pd.concat([pd.DataFrame([result]) for result in results], ignore_index=True, sort=False)
+
+        with open(outCSVDir + '/csvfile{0}.csv'.format(run), 'w') as file:
+            results.to_csv(file, index=False)
+
+    if args.jobs > 1 and measurement is None:
+        pool.close()
+        pool.join()
 
     if args.writeSummaryCSV:
         writeSummaryCSV(outCSVDir, writeByLS=False)
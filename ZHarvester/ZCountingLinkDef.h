@@ -0,0 +1,18 @@
+// dictionary of the shared library lib/libZCounting.so, see Makefile
+#ifdef __CLING__
+
+#pragma link off all globals;
+#pragma link off all classes;
+#pragma link off all functions;
+
+// RooFit model classes
+#pragma link C++ class RooCMSShape+;
+#pragma link C++ class RooGaussDoubleSidedExp+;
+#pragma link C++ class RooHistConvGauss+;
+
+// fit functions, settings and signal and background models used in the fits
+#pragma link C++ defined_in "calculateDataEfficiency.C";
+#pragma link C++ defined_in "Utils/ZMMSignals.hh";
+#pragma link C++ defined_in "Utils/ZMMBackgrounds.hh";
+
+#endif
@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+
+from python.files import file_key, atomic_write
+
+# ------------------------------------------------------------------------------
+def load_cube(fileName, builder, cacheDir=None, **config):
+    """
+    load the per lumisection arrays (cube) of an input file from the cache directory,
+    if they are not cached yet, they are built and stored in a compressed .npz file
+
+    Parameters
+    ----------
+    fileName : str
+        input file from which the cube is filled
+    builder : function
+        function without arguments that returns the cube as dictionary of numpy arrays
+    cacheDir : str
+        directory where the cubes are stored, if None the cube is always built
+    config :
+        configuration (binning, cuts, ...) that goes into the cube
+    """
+    if cacheDir is None:
+        return builder()
+
+    key = file_key(fileName, **config)
+    cacheName = "{0}/cube_{1}_{2}.npz".format(cacheDir, os.path.basename(fileName).split(".")[0], key[:16])
+
+    if os.path.isfile(cacheName):
+        print("INFO:  === load cube from {0}".format(cacheName))
+        with np.load(cacheName) as cube:
+            return {k: cube[k] for k in cube.files}
+
+    cube = builder()
+
+    print("INFO:  === store cube in {0}".format(cacheName))
+    if not os.path.isdir(cacheDir):
+        os.makedirs(cacheDir, exist_ok=True)
+
+    with atomic_write(cacheName) as tmpName:
+        np.savez_compressed(tmpName, **cube)
+
+    return cube
@@ -0,0 +1,349 @@
+import os
+import re
+import json
+from datetime import datetime
+
+import numpy as np
+
+from python.files import atomic_write
+
+# name of the file with the statistics of all jobs in the output directory
+jobstatsName = "jobstats.json"
+
+# resources that are requested if there is no cost model (short queue: memory < 2GB and time < 3h)
+defaultMemory = 1999    # MB
+defaultRuntime = 10799  # s
+
+# minimum number of finished jobs to fit the cost model
+minJobsForModel = 5
+
+# header line of an event in the HTCondor user log, e.g. "005 (1234.002.000) 2022-10-18 13:01:00 Job terminated."
+_eventHeader = re.compile(r"^(\d{3}) \((\d+)\.(\d+)\.\d+\) (\S+ \S+) (.*)$")
+
+# ------------------------------------------------------------------------------
+def _parse_time(string):
+    # newer HTCondor versions write the date in ISO format, older ones as month/day without the year
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%m/%d %H:%M:%S"):
+        try:
+            return datetime.strptime(string, fmt)
+        except ValueError:
+            pass
+    return None
+
+# ------------------------------------------------------------------------------
+def parse_user_log(fileName):
+    """
+    parse the events of the HTCondor user log of a submission.
+    Returns a dictionary with the process id as key and the wall time (s) of the last execution,
+    the peak memory (MB), the return value and the reason if the job was held or aborted
+
+    Parameters
+    ----------
+    fileName : str
+        path to the user log file
+    """
+    jobs = {}
+    if not os.path.isfile(fileName):
+        return jobs
+
+    with open(fileName, "r") as file:
+        lines = file.read().split("\n")
+
+    iLine = 0
+    while iLine < len(lines):
+        header = _eventHeader.match(lines[iLine])
+        iLine += 1
+        if header is None:
+            continue
+
+        code, proc, time, text = header.group(1), int(header.group(3)), _parse_time(header.group(4)), header.group(5)
+
+        # the body of an event goes until the line "..."
+        body = []
+        while iLine < len(lines) and lines[iLine].strip() != "...":
+            body.append(lines[iLine].strip())
+            iLine += 1
+
+        job = jobs.setdefault(proc, {"start": None, "wallTime": None, "peakMemory": 0., "returnValue": None, "reason": None})
+
+        if code == "001":       # job executing
+            job["start"] = time
+            job["reason"] = None
+        elif code == "006":     # image size updated
+            for line in body:
+                value = line.split("-")[0].strip()
+                if line.endswith("MemoryUsage of job (MB)"):
+                    job["peakMemory"] = max(job["peakMemory"], float(value))
+                elif line.endswith("ResidentSetSize of job (KB)"):
+                    job["peakMemory"] = max(job["peakMemory"], float(value) / 1024.)
+        elif code == "005":     # job terminated
+            if job["start"] is not None and time is not None:
+                job["wallTime"] = (time - job["start"]).total_seconds()
+            for line in body:
+                returnValue = re.search(r"return value (-?\d+)", line)
+                if returnValue:
+                    job["returnValue"] = int(returnValue.group(1))
+                elif line.startswith("Memory (MB)"):
+                    usage = line.split(":")[1].split()
+                    if len(usage) > 0 and usage[0].replace(".", "").isdigit():
+                        job["peakMemory"] = max(job["peakMemory"], float(usage[0]))
+        elif code in ("004", "009", "012"):    # job evicted, aborted or held
+            job["reason"] = " ".join([text] + body)
+            if job["start"] is not None and time is not None:
+                job["wallTime"] = (time - job["start"]).total_seconds()
+
+    return jobs
+
+# ------------------------------------------------------------------------------
+def format_event(code, proc, text, body=[]):
+    """
+    event of the HTCondor user log at the current time, for jobs that are not run by HTCondor (see `parse_user_log`)
+
+    Parameters
+    ----------
+    code : str
+        event number, e.g. "001" (executing) or "005" (terminated)
+    proc : int
+        process id of the job
+    text : str
+        text of the event header
+    body : list
+        lines of the event body
+    """
+    lines = ["{0} (000.{1:03d}.000) {2} {3}".format(code, proc, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), text)]
+    lines += ["\t" + line for line in body]
+    lines += ["..."]
+    return "\n".join(lines) + "\n"
+
+# ------------------------------------------------------------------------------
+def failure_reason(job):
+    """
+    classify why a job did not finish from the information of its user log: "memory", "runtime" or "other"
+
+    Parameters
+    ----------
+    job : dict
+        job information from `parse_user_log`
+    """
+    reason = (job.get("reason") or "").lower()
+    if "memory" in reason:
+        return "memory"
+    if "time" in reason or "duration" in reason:
+        return "runtime"
+    return "other"
+
+# ------------------------------------------------------------------------------
+def load_jobstats(directory):
+    """
+    load the statistics of the jobs of an output directory, with one entry for each run and each job
+
+    Parameters
+    ----------
+    directory : str
+        output directory of the jobs
+    """
+    fileName = directory + "/" + jobstatsName
+    if not os.path.isfile(fileName):
+        return {"runs": {}, "jobs": []}
+
+    with open(fileName, "r") as file:
+        return json.load(file)
+
+# ------------------------------------------------------------------------------
+def write_jobstats(directory, jobstats):
+    """
+    store the statistics of the jobs in the output directory
+
+    Parameters
+    ----------
+    directory : str
+        output directory of the jobs
+    jobstats : dict
+        statistics of the runs and the jobs, from `load_jobstats`
+    """
+    with atomic_write(directory + "/" + jobstatsName) as tmpName:
+        with open(tmpName, "w") as file:
+            json.dump(jobstats, file, indent=4, separators=(',', ': '))
+
+# ------------------------------------------------------------------------------
+def _features(nLS, recLumi, nMeasurements):
+    return [1., nLS, recLumi, nMeasurements]
+
+# ------------------------------------------------------------------------------
+def fit_cost_model(jobstats):
+    """
+    fit a linear model of the wall time of the finished jobs as function of the number of lumisections,
+    the recorded luminosity and the number of measurements, and of the peak memory as function of the largest
+    number of lumisections of a run in the job. The coefficients are constrained to be positive.
+    Returns None if there are not enough finished jobs
+
+    Parameters
+    ----------
+    jobstats : dict
+        statistics of the runs and the jobs, from `load_jobstats`
+    """
+    jobs = [job for job in jobstats["jobs"] if job["status"] == "done" and job.get("wallTime") is not None]
+    if len(jobs) < minJobsForModel:
+        return None
+
+    def fit(x, y):
+        x = np.array(x, dtype=np.float64)
+        y = np.array(y, dtype=np.float64)
+        coefficients = np.linalg.lstsq(x, y, rcond=None)[0]
+        # a negative coefficient is set to zero and the other ones are fit again
+        while (coefficients < 0).any():
+            positive = coefficients > 0
+            coefficients = np.zeros(len(coefficients))
+            if positive.any():
+                coefficients[positive] = np.linalg.lstsq(x[:, positive], y, rcond=None)[0]
+            else:
+                break
+        return np.clip(coefficients, 0, None).tolist()
+
+    return {
+        "wallTime": fit([_features(job["nLS"], job["recLumi"], job["nMeasurements"]) for job in jobs], [job["wallTime"] for job in jobs]),
+        "peakMemory": fit([[1., job["maxLS"]] for job in jobs], [job["peakMemory"] for job in jobs]),
+        "nJobs": len(jobs)
+    }
+
+# ------------------------------------------------------------------------------
+def predict_wall_time(model, nLS, recLumi, nMeasurements):
+    """
+    predicted wall time in seconds of a job with the given number of lumisections, recorded luminosity and number of measurements
+
+    Parameters
+    ----------
+    model : dict
+        cost model, from `fit_cost_model`
+    """
+    return float(np.dot(model["wallTime"], _features(nLS, recLumi, nMeasurements)))
+
+# ------------------------------------------------------------------------------
+def predict_peak_memory(model, maxLS):
+    """
+    predicted peak memory in MB of a job with the given largest number of lumisections of a run
+
+    Parameters
+    ----------
+    model : dict
+        cost model, from `fit_cost_model`
+    """
+    return float(np.dot(model["peakMemory"], [1., maxLS]))
+
+# ------------------------------------------------------------------------------
+def job_resources(model, features, factors=(1., 1.), longQueue=False, memoryMargin=1.5, runtimeMargin=3.):
+    """
+    memory (MB) and runtime (s) to request for a job. Without a cost model the limits of the short or long queue are requested,
+    with a cost model the prediction times a safety margin. Both are scaled by the factors of failed previous attempts
+
+    Parameters
+    ----------
+    model : dict or None
+        cost model, from `fit_cost_model`
+    features : dict
+        features of the job: 'nLS', 'recLumi', 'nMeasurements' summed over its runs and 'maxLS' of its largest run
+    factors : tuple
+        factors for the memory and the runtime, from `retry_factors`
+    """
+    if model is None:
+        memory, runtime = (19999, 43200) if longQueue else (defaultMemory, defaultRuntime)
+    else:
+        memory = max(defaultMemory / 2., memoryMargin * predict_peak_memory(model, features["maxLS"]))
+        runtime = max(defaultRuntime / 6., runtimeMargin * predict_wall_time(model, features["nLS"], features["recLumi"], features["nMeasurements"]))
+
+    return int(memory * factors[0]), int(runtime * factors[1])
+
+# ------------------------------------------------------------------------------
+def retry_factors(jobstats, run):
+    """
+    factors for the memory and the runtime of a run: doubled for each previous attempt that failed by exceeding the memory or the runtime
+
+    Parameters
+    ----------
+    jobstats : dict
+        statistics of the runs and the jobs, from `load_jobstats`
+    run : int
+        run number
+    """
+    entry = jobstats["runs"].get(str(run), {})
+    return entry.get("memoryFactor", 1.), entry.get("runtimeFactor", 1.)
+
+# ------------------------------------------------------------------------------
+def update_jobstats(jobstats, jobinfo, finished):
+    """
+    add the jobs of a submission to the statistics, with the wall time and peak memory from the HTCondor user log.
+    The statistics of each run (number of attempts, factors for the resources of the next attempt) are derived from all its jobs,
+    calling this function again for the same submission replaces its jobs
+
+    Parameters
+    ----------
+    jobstats : dict
+        statistics of the runs and the jobs, from `load_jobstats`
+    jobinfo : dict
+        information of the submission, from the jobinfo.json file
+    finished : list
+        True for each job that finished successfully
+    """
+    tag = jobinfo.get("tag", jobinfo["clusterId"])
+    logs = parse_user_log("condor/{0}.log".format(tag))
+    features = jobinfo.get("features", {})
+    resources = jobinfo.get("resources", [])
+    jobs = jobinfo.get("jobs", [[run] for run in jobinfo["runs"]])
+
+    records = [record for record in jobstats["jobs"] if record["tag"] != tag]
+    for ijob, runs in enumerate(jobs):
+        log = logs.get(ijob, {})
+        record = {
+            "tag": tag,
+            "job": ijob,
+            "runs": runs,
+            "wallTime": log.get("wallTime"),
+            "peakMemory": log.get("peakMemory"),
+            "status": "done" if finished[ijob] else "failed",
+            "cause": None
+        }
+        for key in ("nLS", "recLumi", "nMeasurements"):
+            record[key] = sum([features.get(str(run), {}).get(key, 0) for run in runs])
+        record["maxLS"] = max([features.get(str(run), {}).get("nLS", 0) for run in runs])
+
+        if not finished[ijob]:
+            if log.get("start") is None:
+                # the job did not run (yet), this attempt does not count
+                record["status"] = "pending"
+            else:
+                record["cause"] = failure_reason(log)
+                if ijob < len(resources):
+                    # a job killed at its limits is not always held with a reason
+                    requestMemory, requestRuntime = resources[ijob]
+                    if record["cause"] == "other" and (log.get("peakMemory") or 0) >= 0.95 * requestMemory:
+                        record["cause"] = "memory"
+                    elif record["cause"] == "other" and (log.get("wallTime") or 0) >= 0.95 * requestRuntime:
+                        record["cause"] = "runtime"
+        records.append(record)
+
+    jobstats["jobs"] = records
+
+    # statistics of each run from all of its attempts
+    runs = {}
+    previous = jobstats["runs"]
+    for record in records:
+        if record["status"] == "pending":
+            continue
+        for run in record["runs"]:
+            if str(run) not in runs:
+                runs[str(run)] = {key: value for key, value in previous.get(str(run), {}).items() if key in ("nLS", "recLumi", "nMeasurements")}
+                runs[str(run)].update({"attempts": 0, "memoryFactor": 1., "runtimeFactor": 1.})
+            entry = runs[str(run)]
+            entry["attempts"] += 1
+            entry["status"] = record["status"]
+            # the wall time and peak memory belong to the job, which can process several runs: 
+            #   they are only kept in the job records (used by `fit_cost_model`), the run refers to its last job
+            entry["job"] = [record["tag"], record["job"]]
+            entry.update(features.get(str(run), {}))
+            if record["cause"] == "memory":
+                entry["memoryFactor"] *= 2
+            elif record["cause"] == "runtime":
+                entry["runtimeFactor"] *= 2
+    jobstats["runs"] = runs
+
+    return jobstats
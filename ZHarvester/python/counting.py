@@ -0,0 +1,407 @@
+import math
+import numpy as np
+
+# mass window of the signal, the bins outside of it are used for the start values of the background
+signalWindow = (76., 106.)
+
+# mass and width of the Z boson in GeV, for the signal shape if no MC templates are given
+massZ = 91.1876
+widthZ = 2.4952
+
+# widths in GeV of the Gaussian that is folded with the signal shape, the one with the best likelihood is taken
+resolutions = np.arange(0., 3.01, 0.25)
+
+# the signal shapes are made in a mass range that is larger by this amount on each side,
+#   so that the folding with the Gaussian does not lose the events close to the boundaries
+shapeMargin = 10.
+
+# names of the MC templates for each tree and value of 'pass'
+templateCategories = [
+    ("HLT", {2: "HLT2", 1: "HLT1", 0: "HLT0"}),
+    ("Sel", {1: "SelPass", 0: "SelFail"}),
+    ("Glo", {1: "GloPass", 0: "GloFail"}),
+    ("Sta", {1: "StaPass", 0: "StaFail"}),
+]
+
+# ------------------------------------------------------------------------------
+def histogram_to_arrays(hist):
+    """
+    bin contents (without under- and overflow) and bin edges of a 1D histogram
+
+    Parameters
+    ----------
+    hist : TH1
+        histogram to convert
+    """
+    nBins = hist.GetNbinsX()
+    contents = np.array([hist.GetBinContent(i) for i in range(1, nBins+1)], dtype=np.float64)
+    edges = np.array([hist.GetXaxis().GetBinLowEdge(i) for i in range(1, nBins+2)], dtype=np.float64)
+
+    return contents, edges
+
+# ------------------------------------------------------------------------------
+def extended_edges(edges):
+    """
+    bin edges with the same bin width that extend the mass range by `shapeMargin` on each side
+
+    Parameters
+    ----------
+    edges : array
+        bin edges of the histogram, with fixed bin width
+    """
+    width = edges[1] - edges[0]
+    nMargin = int(np.ceil(shapeMargin / width))
+    return edges[0] + width * np.arange(-nMargin, len(edges) + nMargin)
+
+# ------------------------------------------------------------------------------
+def load_templates(mcfilename, massMin, massMax, massBin, ptCut, etaCut):
+    """
+    MC signal templates of all categories with the same selection as in generateTemplate of calculateDataEfficiency.C,
+    in a mass range extended by `shapeMargin` on each side, and the number of events with 0, 1 and 2 muons passing the HLT
+    in bins of the number of primary vertices for the HLT correlation factor
+
+    Parameters
+    ----------
+    mcfilename : str
+        MC file with the trees of each category and the histogram 'hPV'
+    massMin/massMax/massBin : float/float/int
+        mass range and number of bins of the histograms that are fit
+    ptCut/etaCut : float
+        cuts on the transverse momentum and pseudorapidity of the muons
+    """
+    import ROOT
+    from python.utils import load_tree_arrays
+
+    edges = extended_edges(np.linspace(massMin, massMax, massBin+1))
+
+    file_ = ROOT.TFile(mcfilename, "READ")
+    hPV = file_.Get("hPV")
+    npvEdges = np.array([hPV.GetXaxis().GetBinLowEdge(i) for i in range(1, hPV.GetNbinsX()+2)])
+
+    templates = {"edges": edges, "hPV": histogram_to_arrays(hPV)[0]}
+    columns = ["mass", "ptTag", "ptProbe", "etaTag", "etaProbe", "nPV", "pass", "match1", "match2", "eventWeight"]
+    for treeName, names in templateCategories:
+        a = load_tree_arrays(file_.Get(treeName), columns)
+
+        selection = a["match1"].astype(bool) & a["match2"].astype(bool) \
+            & (a["ptTag"] >= ptCut) & (a["ptProbe"] >= ptCut) & (np.abs(a["etaTag"]) <= etaCut) & (np.abs(a["etaProbe"]) <= etaCut)
+
+        for passValue, name in names.items():
+            # the efficiency trees only distinguish passing (pass != 0) and failing probes
+            selected = selection & ((a["pass"] == passValue) if treeName == "HLT" else ((a["pass"] != 0) == bool(passValue)))
+            hist = np.histogram(a["mass"][selected], bins=edges, weights=a["eventWeight"][selected])[0]
+            templates[name] = np.clip(hist, 0., None)
+
+            if treeName == "HLT":
+                inRange = selected & (a["mass"] >= massMin) & (a["mass"] <= massMax)
+                templates["npv_"+name] = np.histogram(a["nPV"][inRange], bins=npvEdges, weights=a["eventWeight"][inRange])[0]
+
+    file_.Close()
+
+    return templates
+
+# ------------------------------------------------------------------------------
+def hlt_correlation(templates, hPV):
+    """
+    correlation factor of the HLT efficiency of the two muons from the MC, reweighted to the pileup distribution in data,
+    as in extractCorrelation_HLT of calculateDataEfficiency.C. Returns 1 if no templates or pileup histogram are given
+
+    Parameters
+    ----------
+    templates : dict
+        MC templates, from `load_templates`
+    hPV : TH1
+        distribution of the number of primary vertices in data, with the same binning as the one in the MC file
+    """
+    if templates is None or hPV is None:
+        return 1.
+
+    data = histogram_to_arrays(hPV)[0]
+    mc = templates["hPV"]
+    if len(data) != len(mc):
+        print("WARNING: === Pileup histograms of data and MC have a different binning, the HLT correlation factor is set to 1")
+        return 1.
+
+    ratio = np.divide(data, mc, out=np.zeros(len(mc)), where=mc > 0)
+    n0, n1, n2 = [(ratio * templates["npv_HLT{0}".format(i)]).sum() for i in (0, 1, 2)]
+
+    if n1 + n2 <= 0:
+        return 1.
+
+    return 4 * (n0 + n1 + n2) * n2 / (n1 + 2 * n2)**2
+
+# ------------------------------------------------------------------------------
+def fold_gaussian(contents, binWidth, resolution):
+    """
+    fold a histogram with a Gaussian of the given width, the Gaussian is integrated over each bin
+
+    Parameters
+    ----------
+    contents : array
+        bin contents of the histogram
+    binWidth : float
+        width of the bins
+    resolution : float
+        width of the Gaussian, no folding if 0
+    """
+    if resolution <= 0:
+        return contents
+
+    nKernel = min(int(np.ceil(5 * resolution / binWidth)), (len(contents) - 1) // 2)
+    borders = (np.arange(-nKernel, nKernel+2) - 0.5) * binWidth / (math.sqrt(2) * resolution)
+    kernel = np.diff([0.5 * math.erf(x) for x in borders])
+
+    return np.convolve(contents, kernel / kernel.sum(), mode="same")
+
+# ------------------------------------------------------------------------------
+def signal_shape(edges, resolution, template=None, templateEdges=None):
+    """
+    fraction of the signal in each bin of the histogram: the MC template, or a Breit-Wigner if no template is given,
+    folded with a Gaussian and normalised to one in the mass range of the histogram
+
+    Parameters
+    ----------
+    edges : array
+        bin edges of the histogram
+    resolution : float
+        width of the Gaussian
+    template : array
+        MC template with the same bin width as the histogram, in the range given by `templateEdges`
+    templateEdges : array
+        bin edges of the template, the range has to contain the one of the histogram
+    """
+    width = edges[1] - edges[0]
+    if template is None:
+        templateEdges = extended_edges(edges)
+        centers = 0.5 * (templateEdges[1:] + templateEdges[:-1])
+        template = 1. / ((centers - massZ)**2 + 0.25 * widthZ**2)
+
+    shape = fold_gaussian(np.asarray(template, dtype=np.float64), width, resolution)
+
+    offset = int(round((edges[0] - templateEdges[0]) / width))
+    shape = shape[offset:offset + len(edges) - 1]
+
+    return shape / shape.sum()
+
+# ------------------------------------------------------------------------------
+def fit_sidebands(contents, centers, sidebands, nIterations=50):
+    """
+    binned maximum likelihood fit of an exponential background exp(p0 + p1 * (m - m0)) to the sidebands,
+    the Poisson likelihood of this model is convex in (p0, p1) and a few Newton steps are sufficient.
+    Returns the parameters and their covariance matrix, or None if the sidebands are empty
+
+    Parameters
+    ----------
+    contents : array
+        bin contents of the histogram
+    centers : array
+        bin centers relative to m0
+    sidebands : array
+        boolean mask of the bins in the sidebands
+    nIterations : int
+        maximum number of Newton steps
+    """
+    n = contents[sidebands]
+    x = centers[sidebands]
+
+    if n.sum() <= 0:
+        return None
+
+    # start from a flat background
+    p = np.array([np.log(n.mean()), 0.])
+    for i in range(nIterations):
+        mu = np.exp(p[0] + p[1] * x)
+        gradient = np.array([(mu - n).sum(), ((mu - n) * x).sum()])
+        hessian = np.array([[mu.sum(), (mu * x).sum()], [(mu * x).sum(), (mu * x**2).sum()]])
+        step = np.linalg.solve(hessian, gradient)
+        p -= step
+        if np.abs(step).max() < 1e-9:
+            break
+
+    mu = np.exp(p[0] + p[1] * x)
+    hessian = np.array([[mu.sum(), (mu * x).sum()], [(mu * x).sum(), (mu * x**2).sum()]])
+
+    return p, np.linalg.inv(hessian)
+
+# ------------------------------------------------------------------------------
+def fit_signal_background(contents, centers, shape, start, nIterations=200):
+    """
+    binned maximum likelihood fit of the signal shape plus an exponential background, Nsig * shape + exp(p0 + p1 * (m - m0)),
+    over the full mass range. The steps are Fisher scoring steps, halved until the likelihood decreases.
+    Returns the parameters (Nsig, p0, p1), their covariance matrix and the negative log likelihood
+
+    Parameters
+    ----------
+    contents : array
+        bin contents of the histogram
+    centers : array
+        bin centers relative to m0
+    shape : array
+        fraction of the signal in each bin, from `signal_shape`
+    start : array
+        start values of (Nsig, p0, p1)
+    nIterations : int
+        maximum number of steps
+    """
+    def expected(theta):
+        background = np.exp(theta[1] + theta[2] * centers)
+        return theta[0] * shape + background, background
+
+    def nll(theta):
+        mu = expected(theta)[0]
+        if (mu <= 0).any():
+            return np.inf
+        return (mu - contents * np.log(mu)).sum()
+
+    theta = np.array(start, dtype=np.float64)
+    current = nll(theta)
+    for i in range(nIterations):
+        mu, background = expected(theta)
+        derivatives = np.array([shape, background, background * centers])
+        gradient = derivatives.dot(1 - contents / mu)
+        fisher = (derivatives / mu).dot(derivatives.T)
+        step = np.linalg.solve(fisher, gradient)
+
+        scale = 1.
+        while nll(theta - scale * step) > current and scale > 1e-6:
+            scale *= 0.5
+        theta -= scale * step
+        previous, current = current, nll(theta)
+
+        if abs(previous - current) < 1e-10 * max(1., abs(current)):
+            break
+
+    mu, background = expected(theta)
+    derivatives = np.array([shape, background, background * centers])
+    fisher = (derivatives / mu).dot(derivatives.T)
+
+    return theta, np.linalg.inv(fisher), current
+
+# ------------------------------------------------------------------------------
+def fit_histogram(contents, edges, template=None, templateEdges=None):
+    """
+    signal and background yields in the full mass range of a histogram from a fit of the signal shape plus an exponential background,
+    the width of the Gaussian folded with the signal shape is chosen from `resolutions` by the best likelihood.
+    Returns the signal yield, the background yield and the chi2/ndf of the fit
+
+    Parameters
+    ----------
+    contents : array
+        bin contents of the histogram (without under- and overflow)
+    edges : array
+        bin edges of the histogram
+    template : array
+        MC template of the signal, a Breit-Wigner is used if None (see `signal_shape`)
+    templateEdges : array
+        bin edges of the template
+    """
+    import uncertainties as unc
+
+    if contents.sum() <= 0:
+        return unc.ufloat(0., 0.), unc.ufloat(0., 0.), 0.
+
+    centers = 0.5 * (edges[1:] + edges[:-1]) - 0.5 * (signalWindow[0] + signalWindow[1])
+    inWindow = (edges[:-1] >= signalWindow[0]) & (edges[1:] <= signalWindow[1])
+
+    # start values: background from the sidebands, the rest is signal
+    sidebandFit = fit_sidebands(contents, centers, ~inWindow)
+    if sidebandFit is None:
+        p = np.array([np.log(max(contents.mean(), 1.) * 1e-3), 0.])
+    else:
+        p = sidebandFit[0]
+    nsig = max(contents.sum() - np.exp(p[0] + p[1] * centers).sum(), 0.1 * contents.sum())
+
+    best = None
+    for resolution in resolutions:
+        shape = signal_shape(edges, resolution, template, templateEdges)
+        result = fit_signal_background(contents, centers, shape, [nsig, p[0], p[1]])
+        if best is None or result[2] < best[2]:
+            best = result + (shape,)
+
+    theta, cov, _, shape = best
+
+    background = np.exp(theta[1] + theta[2] * centers)
+    gradient = np.array([background.sum(), (background * centers).sum()])
+    nbkg = unc.ufloat(background.sum(), np.sqrt(gradient.dot(cov[1:, 1:]).dot(gradient)))
+
+    # Neyman chi2, bins without entries are skipped as in RooPlot::chiSquare;
+    #   the free parameters are the signal yield, the two background parameters and the resolution
+    mu = theta[0] * shape + background
+    filled = contents > 0
+    ndf = max(filled.sum() - 4, 1)
+    chi2 = (((contents - mu)**2)[filled] / contents[filled]).sum() / ndf
+
+    return unc.ufloat(theta[0], np.sqrt(cov[0, 0])), nbkg, float(chi2)
+
+# ------------------------------------------------------------------------------
+def fast_results(h2HLT, h1HLT, hSelPass, hSelFail, hGloPass, hGloFail, hStaPass, hStaFail, cIO, templates=None, hPV=None):
+    """
+    closed form estimate of the efficiencies and the Z yield from fits of the signal shape plus an exponential background
+    over the full mass range, as a fast alternative to the RooFit fits. The yields are the ones in the full mass range,
+    as from the RooFit fits. The results have the same keys as the ones extracted from the fits,
+    None is returned if no signal is found
+
+    Parameters
+    ----------
+    h2HLT/h1HLT : TH1
+        histograms with both / exactly one muon passing the HLT
+    hSelPass/hSelFail, hGloPass/hGloFail, hStaPass/hStaFail : TH1
+        histograms of passing / failing probes for the selection, global and standalone muon efficiency
+    cIO : float
+        correlation factor between inner and outer track
+    templates : dict
+        MC templates from `load_templates` for the signal shapes and the HLT correlation factor,
+        if None a Breit-Wigner is used and the HLT correlation factor is 1
+    hPV : TH1
+        distribution of the number of primary vertices in data, to reweight the MC for the HLT correlation factor
+    """
+
+    def fit(hist, name):
+        contents, edges = histogram_to_arrays(hist)
+        if templates is None:
+            return fit_histogram(contents, edges)
+        return fit_histogram(contents, edges, templates[name], templates["edges"])
+
+    res = {}
+
+    cHLT = hlt_correlation(templates, hPV)
+
+    # N2 = eff^2 * cHLT * Nz and N1 = 2 * eff * (1 - cHLT * eff) * Nz
+    N2, NbkgPass, chi2Pass = fit(h2HLT, "HLT2")
+    N1, NbkgFail, chi2Fail = fit(h1HLT, "HLT1")
+
+    if N2.nominal_value <= 0:
+        return None
+
+    res.update({
+        "effHLT": 2 * N2 / (cHLT * (2 * N2 + N1)),
+        "cHLT": cHLT,
+        "zReco": cHLT * (N2 + 0.5 * N1)**2 / N2,
+        "NbkgHLTPass": NbkgPass,
+        "NbkgHLTFail": NbkgFail,
+        "chi2HLT": 0.5 * (chi2Pass + chi2Fail)
+    })
+
+    for name, hPass, hFail in (
+        ("Sel", hSelPass, hSelFail),
+        ("Glo", hGloPass, hGloFail),
+        ("Sta", hStaPass, hStaFail),
+    ):
+        NsigPass, NbkgPass, chi2Pass = fit(hPass, name+"Pass")
+        NsigFail, NbkgFail, chi2Fail = fit(hFail, name+"Fail")
+
+        if NsigPass.nominal_value <= 0:
+            return None
+
+        res.update({
+            "eff"+name: NsigPass / (NsigPass + NsigFail),
+            "Nsig"+name: NsigPass + NsigFail,
+            "Nbkg"+name+"Pass": NbkgPass,
+            "Nbkg"+name+"Fail": NbkgFail,
+            "chi2"+name: 0.5 * (chi2Pass + chi2Fail)
+        })
+
+    res["cIO"] = cIO
+    res["zDel"] = res["zReco"] * cIO**2 / (res["effSel"] * res["effGlo"] * res["effSta"])**2
+
+    return res
@@ -0,0 +1,79 @@
+import os
+import json
+import hashlib
+from contextlib import contextmanager
+
+# ------------------------------------------------------------------------------
+def file_identity(fileName):
+    """
+    identity of an input file from its path, modification time and size,
+    None if the file does not exist
+
+    Parameters
+    ----------
+    fileName : str
+        path to the file
+    """
+    if fileName is None or not os.path.isfile(fileName):
+        return None
+
+    stat = os.stat(fileName)
+    return {
+        "file": os.path.realpath(fileName),
+        "mtime": stat.st_mtime,
+        "size": stat.st_size
+    }
+
+# ------------------------------------------------------------------------------
+def digest(value):
+    """
+    hash of a json serializable object (e.g. the configuration of the fits)
+
+    Parameters
+    ----------
+    value :
+        object to hash, the keys of dictionaries are sorted
+    """
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+# ------------------------------------------------------------------------------
+def file_key(fileName, **config):
+    """
+    key of the data derived from an input file, built from the identity of the file and the configuration
+    that was used to derive the data; the key changes as soon as one of them changes
+
+    Parameters
+    ----------
+    fileName : str
+        input file
+    config :
+        configuration (binning, cuts, version, ...) that goes into the derived data
+    """
+    identifier = file_identity(fileName)
+    if identifier is None:
+        raise FileNotFoundError(fileName)
+
+    identifier["config"] = config
+    return digest(identifier)
+
+# ------------------------------------------------------------------------------
+@contextmanager
+def atomic_write(fileName):
+    """
+    context manager that gives a temporary name in the directory of the file to write to.
+    The temporary file replaces the file at the end of the block, so that other processes never read an incomplete file;
+    if the block raises, the temporary file is removed. The temporary name keeps the extension (numpy.savez appends '.npz' otherwise)
+
+    Parameters
+    ----------
+    fileName : str
+        file to write
+    """
+    root, extension = os.path.splitext(fileName)
+    tmpName = "{0}.{1}.tmp{2}".format(root, os.getpid(), extension)
+    try:
+        yield tmpName
+        os.replace(tmpName, fileName)
+    finally:
+        if os.path.isfile(tmpName):
+            os.remove(tmpName)
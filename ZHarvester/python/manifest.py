@@ -0,0 +1,117 @@
+import os
+import json
+
+from python.files import file_identity, digest, atomic_write
+
+# name of the manifest file in the output directory of each run
+manifestName = "manifest.json"
+
+# ------------------------------------------------------------------------------
+def lumisection_digest(byLS):
+    """
+    hash of the set of lumisections of a measurement. Only the run and lumisection numbers go into the hash,
+    the luminosity is taken from the byLS data at each call and does not enter the fits
+
+    Parameters
+    ----------
+    byLS : pandas.DataFrame
+        byLS data of the measurement with the columns 'run' and 'ls'
+    """
+    lumisections = sorted(zip(byLS['run'].astype(int).tolist(), byLS['ls'].astype(int).tolist()))
+    return digest(lumisections)
+
+# ------------------------------------------------------------------------------
+def fit_code_identity():
+    """
+    identity of the code that performs the fits: calculateDataEfficiency.C, the signal and background models 
+    and RooFit model classes in Utils and the fit library built from them (lib/libZCounting.so, None if it was not built)
+    """
+    import glob
+
+    directory = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    sources = [directory + "/calculateDataEfficiency.C"] + sorted(glob.glob(directory + "/Utils/*.cc") + glob.glob(directory + "/Utils/*.h*"))
+
+    return {
+        "sources": [file_identity(source) for source in sources],
+        "library": file_identity(directory + "/lib/libZCounting.so")
+    }
+
+# ------------------------------------------------------------------------------
+def measurement_manifest(inputFiles, byLS, config):
+    """
+    manifest entry of a measurement: identity of the input files, digest of the lumisections and of the fit configuration.
+    The fits of a measurement are only repeated if its entry differs from the stored one
+
+    Parameters
+    ----------
+    inputFiles : list
+        input files with the histograms or trees of the measurement
+    byLS : pandas.DataFrame
+        byLS data of the measurement
+    config : dict
+        configuration of the fits (models, templates, binning, cuts, ...)
+    """
+    return {
+        "inputs": [file_identity(f) for f in inputFiles],
+        "lumisections": lumisection_digest(byLS),
+        "config": digest(config)
+    }
+
+# ------------------------------------------------------------------------------
+def load_manifest(directory):
+    """
+    load the manifest of an output directory, with one entry for each measurement that was fit.
+    Returns an empty dictionary if there is no manifest
+
+    Parameters
+    ----------
+    directory : str
+        output directory of the fits
+    """
+    fileName = directory + "/" + manifestName
+    if not os.path.isfile(fileName):
+        return {}
+
+    try:
+        with open(fileName, "r") as file:
+            return json.load(file)
+    except ValueError:
+        print("WARNING: === Manifest {0} can not be read, all measurements are fit again".format(fileName))
+        return {}
+
+# ------------------------------------------------------------------------------
+def manifest_unchanged(directory, measurement, entry):
+    """
+    check if the stored manifest entry of a measurement is the same as the current one
+
+    Parameters
+    ----------
+    directory : str
+        output directory of the fits
+    measurement : int
+        number of the measurement
+    entry : dict
+        current manifest entry, from `measurement_manifest`
+    """
+    return load_manifest(directory).get(str(measurement)) == entry
+
+# ------------------------------------------------------------------------------
+def update_manifest(directory, measurement, entry):
+    """
+    store the manifest entry of a measurement after its fits were successful
+
+    Parameters
+    ----------
+    directory : str
+        output directory of the fits
+    measurement : int
+        number of the measurement
+    entry : dict
+        manifest entry, from `measurement_manifest`
+    """
+    manifest = load_manifest(directory)
+    manifest[str(measurement)] = entry
+
+    with atomic_write(directory + "/" + manifestName) as tmpName:
+        with open(tmpName, "w") as file:
+            json.dump(manifest, file, indent=4, sort_keys=True)
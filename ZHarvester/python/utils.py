@@ -1,33 +1,214 @@
-
 # ------------------------------------------------------------------------------
-def load_input_csv(byLS_data):
+def load_input_csv(byLS_data, beginRun=None, endRun=None, runs=None, cacheDir=None):
     """
     load input by lumisection CSV file, convert it and return the data 
     
+    If a cache directory is given, the converted data is cached there as store partitioned by run (see `write_byLS_partitions`) 
+    in the subdirectory byLS, keyed by the path, modification time and size of the CSV file. Later calls only read the files 
+    of the selected runs instead of parsing the CSV file, a store that can not be read is made again.
+
+    If a directory is given, it is taken as store partitioned by run and only the files of the selected runs are read.
+
     Parameters
     ----------
     byLS_data : str
-        path to the file by lumisection CSV file
+        path to the file by lumisection CSV file or to the directory of the partitioned store
+    beginRun/endRun : int
+        only return the runs with beginRun <= run < endRun, all runs if None
+    runs : list, optional
+        only return these runs of the range
+    cacheDir : str
+        directory of the cache, the converted data is not cached if None
     """
+    import os
+    import pickle
+    import shutil
+    from python.files import file_key
+
+    byLS_data = str(byLS_data)
+
+    if os.path.isdir(byLS_data):
+        return load_byLS_partitions(byLS_data, beginRun=beginRun, endRun=endRun, runs=runs)
+
+    if cacheDir is None:
+        return select_runs(parse_input_csv(byLS_data), beginRun=beginRun, endRun=endRun, runs=runs)
+
+    # version of the conversion, to be increased if the format of the converted data changes
+    key = file_key(byLS_data, version=3, format=byLS_partition_format())
+    store = "{0}/byLS/{1}.{2}".format(cacheDir, os.path.basename(byLS_data), key[:16])
+
+    unreadable = False
+    if os.path.isdir(store):
+        try:
+            return load_byLS_partitions(store, beginRun=beginRun, endRun=endRun, runs=runs, allowEmpty=True)
+        except (OSError, EOFError, ValueError, RuntimeError, AttributeError, ImportError, pickle.UnpicklingError) as error:
+            print("WARNING: === Can not read the converted csv file from {0} ({1}), parse the csv file again".format(store, error))
+            unreadable = True
+
+    byLS = parse_input_csv(byLS_data)
 
+    # the store is written to a temporary directory first, so that it is complete when it appears
+    tmpStore = "{0}.{1}.tmp".format(store, os.getpid())
+    try:
+        write_byLS_partitions(byLS, tmpStore)
+        if unreadable:
+            shutil.rmtree(store, ignore_errors=True)
+        if os.path.isdir(store):
+            # made by another process in the meantime
+            shutil.rmtree(tmpStore)
+        else:
+            os.rename(tmpStore, store)
+            print("INFO:  === store converted csv file in {0}".format(store))
+    except OSError:
+        print("WARNING: === Can not store the converted csv file in {0}".format(store))
+        shutil.rmtree(tmpStore, ignore_errors=True)
+
+    return select_runs(byLS, beginRun=beginRun, endRun=endRun, runs=runs)
+
+# ------------------------------------------------------------------------------
+def select_runs(byLS_data, beginRun=None, endRun=None, runs=None):
+    """
+    select the runs with beginRun <= run < endRun and, if given, in the list of runs
+
+    Parameters
+    ----------
+    byLS_data : pandas.DataFrame
+        by lumisection data
+    beginRun/endRun : int
+        first run and the run after the last one, no limit if None
+    runs : list, optional
+        runs to select
+    """
+    selected = byLS_data['run'] >= int(beginRun) if beginRun is not None else byLS_data['run'] == byLS_data['run']
+    if endRun is not None:
+        selected &= byLS_data['run'] < int(endRun)
+    if runs is not None:
+        selected &= byLS_data['run'].isin([int(run) for run in runs])
+
+    return byLS_data.loc[selected]
+
+# ------------------------------------------------------------------------------
+def byLS_partition_format():
+    """
+    file format of the store partitioned by run: typed Parquet files if pyarrow is available, pickle files otherwise
+    """
+    try:
+        import pyarrow
+    except ImportError:
+        return "pkl"
+
+    return "parquet"
+
+# ------------------------------------------------------------------------------
+def write_byLS_partitions(byLS_data, directory):
+    """
+    split the converted by lumisection data by run and store one file for each run in the directory 
+    (Parquet or pickle, see `byLS_partition_format`), so that jobs that process single runs only read the data of their run
+
+    Parameters
+    ----------
+    byLS_data : pandas.DataFrame
+        converted by lumisection data, from `load_input_csv`
+    directory : str
+        directory of the partitioned store
+    """
+    import os
+    from python.files import atomic_write
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory, exist_ok=True)
+
+    extension = byLS_partition_format()
+
+    print("INFO:  === write by lumisection data of {0} runs to {1}".format(byLS_data['run'].nunique(), directory))
+    for run, byLS_run in byLS_data.groupby('run', sort=True):
+        fileName = "{0}/byLS_{1}.{2}".format(directory, run, extension)
+        with atomic_write(fileName) as tmpName:
+            if extension == "parquet":
+                byLS_run.to_parquet(tmpName)
+            else:
+                byLS_run.to_pickle(tmpName)
+
+# ------------------------------------------------------------------------------
+def load_byLS_partitions(directory, beginRun=None, endRun=None, runs=None, allowEmpty=False):
+    """
+    load the by lumisection data of the selected runs from the store partitioned by run, 
+    only the files of the selected runs are read
+
+    Parameters
+    ----------
+    directory : str
+        directory of the partitioned store, from `write_byLS_partitions`
+    beginRun/endRun : int
+        only load the runs with beginRun <= run < endRun, all runs if None
+    runs : list, optional
+        only load these runs of the range
+    allowEmpty : Boolean
+        return an empty selection if no run is selected instead of raising an error
+    """
+    import glob
+    import os
     import pandas as pd
-    
-    byLS_file = open(str(byLS_data))
-    byLS_lines = byLS_file.readlines()
-    byLS_data = pd.read_csv(byLS_data, sep=',', low_memory=False,
-        skiprows=lambda x: byLS_lines[x].startswith('#') and not byLS_lines[x].startswith('#run'))
+
+    def read(fileName):
+        return pd.read_parquet(fileName) if fileName.endswith(".parquet") else pd.read_pickle(fileName)
+
+    allFileNames = sorted(glob.glob(directory + "/byLS_*.parquet") + glob.glob(directory + "/byLS_*.pkl"))
+    runs = None if runs is None else set(int(run) for run in runs)
+
+    fileNames = []
+    for fileName in allFileNames:
+        run = int(os.path.basename(fileName).split(".")[0][5:])
+        if (beginRun is None or run >= int(beginRun)) and (endRun is None or run < int(endRun)) and (runs is None or run in runs):
+            fileNames.append(fileName)
+
+    if len(fileNames) == 0:
+        if allowEmpty and len(allFileNames) > 0:
+            return read(allFileNames[0]).iloc[0:0]
+        raise RuntimeError("No by lumisection data for the runs from {0} to {1} in {2}".format(beginRun, endRun, directory))
+
+    print("INFO:  === load by lumisection data of {0} runs from {1}".format(len(fileNames), directory))
+    return pd.concat([read(fileName) for fileName in fileNames], sort=False)
+
+# ------------------------------------------------------------------------------
+def parse_input_csv(byLS_data):
+    """
+    parse and convert the by lumisection CSV file from brilcalc: 
+    run, fill and lumisection numbers as integers, luminosities in /pb and one entry per lumisection
+
+    Parameters
+    ----------
+    byLS_data : str
+        path to the file by lumisection CSV file
+    """
+    import numpy as np
+    import pandas as pd
+
+    # the header is the commented line starting with '#run', all other commented lines (before and after the data) are skipped
+    with open(byLS_data) as byLS_file:
+        for nSkip, line in enumerate(byLS_file):
+            if line.startswith('#run'):
+                columns = line.strip().split(',')
+                break
+        else:
+            raise RuntimeError("No header line starting with '#run' in {0}".format(byLS_data))
+
+    byLS_data = pd.read_csv(byLS_data, sep=',', engine='c', comment='#', header=None, names=columns, 
+        skiprows=nSkip+1, dtype={'#run:fill': str, 'ls': str, 'time': str})
         
     print("INFO:  === formatting csv file...")    # formatting the csv
-    byLS_data[['run', 'fill']] = byLS_data['#run:fill'].str.split(':', expand=True).apply(pd.to_numeric)
-    byLS_data['ls'] = byLS_data['ls'].str.split(':', expand=True)[0].apply(pd.to_numeric)   
+    runFill = byLS_data['#run:fill'].str.split(':', n=1, expand=True)
+    byLS_data['run'] = runFill[0].astype(np.int64)
+    byLS_data['fill'] = runFill[1].astype(np.int64)
+    byLS_data['ls'] = byLS_data['ls'].str.split(':', n=1, expand=True)[0].astype(np.int64)
 
     if 'delivered(/ub)' in byLS_data.columns.tolist():  # convert to /pb
-        byLS_data['delivered(/ub)'] = byLS_data['delivered(/ub)'].apply(lambda x: x / 1000000.)
-        byLS_data['recorded(/ub)'] = byLS_data['recorded(/ub)'].apply(lambda x: x / 1000000.)
+        byLS_data['delivered(/ub)'] = byLS_data['delivered(/ub)'] / 1000000.
+        byLS_data['recorded(/ub)'] = byLS_data['recorded(/ub)'] / 1000000.
         byLS_data = byLS_data.rename(index=str, columns={'delivered(/ub)': 'delivered(/pb)', 'recorded(/ub)': 'recorded(/pb)'})
     elif 'delivered(/fb)' in byLS_data.columns.tolist():  # convert to /pb
-        byLS_data['delivered(/fb)'] = byLS_data['delivered(/fb)'].apply(lambda x: x * 1000.)
-        byLS_data['recorded(/fb)'] = byLS_data['recorded(/fb)'].apply(lambda x: x * 1000.)
+        byLS_data['delivered(/fb)'] = byLS_data['delivered(/fb)'] * 1000.
+        byLS_data['recorded(/fb)'] = byLS_data['recorded(/fb)'] * 1000.
         byLS_data = byLS_data.rename(index=str, columns={'delivered(/fb)': 'delivered(/pb)', 'recorded(/fb)': 'recorded(/pb)'})
 
     # if there are multiple entries of the same ls (for example from different triggers), 
@@ -83,6 +264,9 @@ def getFileName(directory, run):
     else:
         return eosFileList[0]
 
+# arrays of the histograms of the last file that was read in `load_histogram`
+_histograms_by_file = {}
+
 # ------------------------------------------------------------------------------
 def load_histogram(
     name,
@@ -97,6 +281,7 @@ def load_histogram(
     load 2D histograms, project the specified lumisections to the mass axis: 
     - if pileup=False with (mass, lumisections); rebinning possible
     - if pileup=True, (PU, lumisections)
+    The file is opened only once, all its histograms are kept as numpy arrays until another file is loaded.
     
     Parameters
     ----------
@@ -116,40 +301,443 @@ def load_histogram(
         If the pileup histogram is to be returned
     """
 
-    import ROOT 
-    
-    file_ = ROOT.TFile(fileName)
-    
-    h_X_ls = file_.Get("{0}{1}".format(prefix, name)).Clone("{0}{1}{2}".format(prefix, name, suffix))
-    h_X_ls.SetDirectory(0)
-    h_X = h_X_ls.ProjectionY("h_tmp_{0}_{1}_{2}".format(name, run, suffix), lumisections[0], lumisections[0], "e")
-    
-    for ls in lumisections[1:]:
-        h_X.Add(h_X_ls.ProjectionY("h_tmp_{0}_{1}_{2}_{3}".format(name, run, ls, suffix), ls, ls, "e"))
-    
+    import os
+
+    # all histograms of a file are read only once and kept in memory for the following calls
+    key = (os.path.realpath(fileName), os.path.getmtime(fileName), prefix)
+    if key not in _histograms_by_file:
+        print("INFO:  === read histograms from {0}".format(fileName))
+        _histograms_by_file.clear()
+        _histograms_by_file[key] = read_histograms_by_ls(fileName, prefix=prefix)
+
+    return histogram_from_cube(_histograms_by_file[key], name, lumisections, run=run, suffix=suffix,
+        MassBin=MassBin, MassMin=MassMin, MassMax=MassMax, pileup=pileup)
+
+# ------------------------------------------------------------------------------
+def load_tree_arrays(tree, columns):
+    """
+    read the branches of a TTree into numpy arrays with one single pass over the tree
+
+    Parameters
+    ----------
+    tree : TTree
+        tree to read
+    columns : list
+        names of the branches to read
+    """
+    import numpy as np
+    import ROOT
+
+    arrays = ROOT.RDataFrame(tree).AsNumpy(columns)
+
+    return {key: np.asarray(value) for key, value in arrays.items()}
+
+# ------------------------------------------------------------------------------
+def find_bin(values, nBins, xMin, xMax):
+    """
+    vectorised bin index of a histogram with fixed bin width, 
+    computed in the same way as in TAxis::FindFixBin (underflow in bin 0 and overflow in bin nBins+1)
+
+    Parameters
+    ----------
+    values : array
+        values for which the bin index is computed
+    nBins/xMin/xMax : int/float/float
+        Number of bins / Lower bound / Upper bound
+    """
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.float64)
+
+    with np.errstate(invalid="ignore"):
+        iBin = 1 + (nBins * (values - xMin) / (xMax - xMin)).astype(np.int64)
+    iBin[values < xMin] = 0
+    iBin[~(values < xMax)] = nBins + 1
+
+    return iBin
+
+# ------------------------------------------------------------------------------
+def th2_to_array(hist, sumw2=False):
+    """
+    copy the bin contents (or the sum of squared weights) of a 2D histogram into a numpy array 
+    of shape (nBinsX+2, nBinsY+2), including under- and overflow bins
+
+    Parameters
+    ----------
+    hist : TH2
+        histogram to convert
+    sumw2 : Boolean
+        If the sum of squared weights is to be returned instead of the bin contents
+    """
+    import numpy as np
+    import ROOT
+
+    nX = hist.GetNbinsX()+2
+    nY = hist.GetNbinsY()+2
+
+    if sumw2:
+        buffer, dtype = hist.GetSumw2().GetArray(), np.float64
+    else:
+        for arrayType, dtype in (
+            (ROOT.TArrayD, np.float64), (ROOT.TArrayF, np.float32), (ROOT.TArrayI, np.int32), 
+            (ROOT.TArrayS, np.int16), (ROOT.TArrayC, np.int8)
+        ):
+            if isinstance(hist, arrayType):
+                break
+        buffer = hist.GetArray()
+
+    contents = np.ndarray((nX*nY,), dtype=dtype, buffer=buffer).copy()
+
+    # global bin number in ROOT is binx + (nbinsx+2) * biny
+    return contents.reshape(nY, nX).T
+
+# ------------------------------------------------------------------------------
+def read_histograms_by_ls(fileName, names=None, prefix=""):
+    """
+    read 2D histograms with (lumisection, X) from a file into numpy arrays, opening the file only once.
+    Returns a dictionary with the arrays of the bin contents, the sum of squared weights if available ("{name}_sumw2"), 
+    and the binning of the X axis ("{name}_axis" with number of bins, lower and upper bound)
+
+    Parameters
+    ----------
+    fileName : str
+        file where the histograms are stored
+    names : list
+        names of the histograms to load, if None all 2D histograms in the directory given by the prefix are loaded
+    prefix : str
+        prefix of the histogram names in the file
+    """
+    import numpy as np
+    import ROOT
+
+    file_ = ROOT.TFile(fileName, "READ")
+
+    if names is None:
+        directory = file_.Get(prefix.rstrip("/")) if prefix.rstrip("/") else file_
+        names = [key.GetName() for key in directory.GetListOfKeys() if key.GetClassName().startswith("TH2")]
+
+    hists = {}
+    for name in names:
+        h_X_ls = file_.Get("{0}{1}".format(prefix, name))
+
+        hists[name] = th2_to_array(h_X_ls)
+        if h_X_ls.GetSumw2N() > 0:
+            hists[name+"_sumw2"] = th2_to_array(h_X_ls, sumw2=True)
+
+        axis = h_X_ls.GetYaxis()
+        hists[name+"_axis"] = np.array([axis.GetNbins(), axis.GetXmin(), axis.GetXmax()])
+
+    file_.Close()
+
+    return hists
+
+# ------------------------------------------------------------------------------
+def histogram_from_cube(
+    hists,
+    name,
+    lumisections=[0,],
+    run=0, 
+    suffix="", 
+    MassBin=50, MassMin=66, MassMax=116, 
+    pileup=False
+):
+    """
+    sum the specified lumisections of a histogram that was read with `read_histograms_by_ls` 
+    and return it as a TH1D, bin by bin identical to the sum of the ProjectionY of each lumisection: 
+    - if pileup=False in mass, rebinned to (MassBin, MassMin, MassMax) by assigning each original bin 
+        with its bin center to a new bin; the bin centers are computed as in TAxis::GetBinCenter
+    - if pileup=True in PU, with the original binning and errors
+
+    Parameters
+    ----------
+    hists : dict
+        dictionary with the arrays of the histograms by lumisection
+    name : str
+        name of the histogram 
+    lumisections : list
+        list of lumisections that are taken from the histogram
+    run : integer
+        run number 
+    suffix : str
+        suffix for naming         
+    MassBin/MassMin/MassMax : int
+        For rebinning, Number of bins / Lower bound / Upper bound 
+    pileup : Boolean
+        If the pileup histogram is to be returned
+    """
+    import numpy as np
+    import ROOT
+
+    contents = hists[name]
+    nBins, xMin, xMax = hists[name+"_axis"]
+    nBins = int(nBins)
+
+    # select the lumisections with one masked reduction, lumisections that are not stored are empty
+    selected = np.zeros(len(contents), dtype=bool)
+    lumisections = np.asarray(lumisections, dtype=np.int64)
+    selected[lumisections[lumisections < len(contents)]] = True
+
+    h_X = contents[selected].astype(np.float64).sum(axis=0)
+
     if pileup:
-        h_X.SetDirectory(0)
-        return h_X
-        
+        hPU = ROOT.TH1D("h_tmp_{0}_{1}_{2}".format(name, run, suffix), "", nBins, xMin, xMax)
+        hPU.SetDirectory(0)
+        hPU.Sumw2()
+        if name+"_sumw2" in hists:
+            sumw2 = hists[name+"_sumw2"][selected].sum(axis=0)
+        else:
+            sumw2 = h_X
+        for iBin in range(nBins+2):
+            hPU.SetBinContent(iBin, h_X[iBin])
+            hPU.SetBinError(iBin, np.sqrt(sumw2[iBin]))
+        hPU.SetEntries(h_X.sum())
+        return hPU
+
+    # rebinning with the bin centers of the original histogram, in the same way as TAxis::GetBinCenter 
+    #   (without the overflow bin)
+    binWidth = (xMax - xMin) / nBins
+    centers = xMin + (np.arange(nBins+1) - 1) * binWidth + 0.5 * binWidth
+    inRange = (centers >= MassMin) & (centers <= MassMax)
+    newBins = find_bin(centers[inRange], MassBin, MassMin, MassMax)
+    newContents = np.bincount(newBins, weights=h_X[:nBins+1][inRange], minlength=MassBin+2)
+
     # create new histogram in correct bin range
     hNew = ROOT.TH1D("h_mass_{0}_{1}_{2}_{3}".format(
-        name, run, lumisections[0], suffix), "",MassBin, MassMin, MassMax)
-    
-    for ibin in range(0, h_X.GetNbinsX()+1):
-        binCenter = h_X.GetBinCenter(ibin)
-        if binCenter < MassMin:
-            continue
-        elif binCenter > MassMax:
-            break
-        else:
-            content = h_X.GetBinContent(ibin)
-            newBin = hNew.FindBin(binCenter)
-            hNew.SetBinContent(newBin, hNew.GetBinContent(newBin) + content)
-        
+        name, run, lumisections[0] if len(lumisections) > 0 else "", suffix), "",MassBin, MassMin, MassMax)
+    for iBin in np.unique(newBins):
+        hNew.SetBinContent(int(iBin), newContents[iBin])
+
+    # each bin of the original histogram counts as one entry, as with SetBinContent in `load_histogram`
+    hNew.SetEntries(int(inRange.sum()))
     hNew.SetDirectory(0)
 
     return hNew
 
+# ------------------------------------------------------------------------------
+def count_by_ls(tree, lumisections):
+    """
+    count the number of entries in each lumisection, reading the `lumiBlock` branch only once.
+    Equivalent to calling `tree.GetEntries("lumiBlock==N")` for each lumisection N
+    
+    Parameters
+    ----------
+    tree : TTree or array
+        tree with a `lumiBlock` branch, or an array with the lumisection of each entry
+    lumisections : list
+        list of lumisections for which the entries are counted
+    """
+    import numpy as np
+
+    if hasattr(tree, "GetEntries"):
+        lumiBlocks = load_tree_arrays(tree, ["lumiBlock"])["lumiBlock"]
+    else:
+        lumiBlocks = np.asarray(tree)
+
+    lumisections = np.asarray(lumisections, dtype=np.int64)
+    if len(lumisections) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    nMax = max(lumiBlocks.max() if len(lumiBlocks) > 0 else 0, lumisections.max()) + 1
+    counts = np.bincount(lumiBlocks.astype(np.int64), minlength=nMax)
+
+    return counts[lumisections]
+
+# ------------------------------------------------------------------------------
+def histogram_by_ls(lumiBlocks, values, lumisections, nBins, xMin, xMax, selection=None):
+    """
+    fill one histogram per lumisection in one vectorised pass.
+    The binning follows the ROOT convention (TAxis::FindFixBin) with the underflow in bin 0
+    and the overflow in bin nBins+1, so that the result agrees bin by bin with filling a TH1D
+    via `TTree::Draw` for each lumisection separately.
+    Returns an array of shape (len(lumisections), nBins+2)
+
+    Parameters
+    ----------
+    lumiBlocks : array
+        lumisection of each entry
+    values : array
+        value of each entry that is histogrammed
+    lumisections : list
+        sorted list of lumisections for which histograms are filled, entries of other lumisections are ignored
+    nBins/xMin/xMax : int/float/float
+        Number of bins / Lower bound / Upper bound
+    selection : array, optional
+        boolean mask to select entries
+    """
+    import numpy as np
+
+    lumisections = np.asarray(lumisections, dtype=np.int64)
+    if len(lumisections) == 0:
+        return np.zeros((0, nBins+2))
+
+    lumiBlocks = np.asarray(lumiBlocks)
+    values = np.asarray(values, dtype=np.float64)
+
+    if selection is not None:
+        lumiBlocks = lumiBlocks[selection]
+        values = values[selection]
+
+    # position of each entry in the list of lumisections
+    iLS = np.searchsorted(lumisections, lumiBlocks)
+    iLS = np.minimum(iLS, len(lumisections)-1)
+    known = lumisections[iLS] == lumiBlocks
+    iLS = iLS[known]
+    values = values[known]
+
+    iBin = find_bin(values, nBins, xMin, xMax)
+
+    counts = np.bincount(iLS * (nBins+2) + iBin, minlength=len(lumisections) * (nBins+2))
+
+    return counts.reshape(len(lumisections), nBins+2).astype(np.float64)
+
+# ------------------------------------------------------------------------------
+def add_to_histogram(hist, contents):
+    """
+    add bin contents (including under- and overflow) to a histogram,
+    equivalent to filling it with the unweighted entries via `TTree::Draw("x>>+h")`
+
+    Parameters
+    ----------
+    hist : TH1
+        histogram that is filled
+    contents : array
+        bin contents of length hist.GetNbinsX()+2
+    """
+    for iBin, content in enumerate(contents):
+        if content != 0:
+            hist.AddBinContent(iBin, content)
+
+    hist.SetEntries(hist.GetEntries() + contents.sum())
+
+# ------------------------------------------------------------------------------
+def run_in_processes(functions, parallel=True):
+    """
+    call functions that do not return anything (e.g. fits that write their results into files) 
+    at the same time in separate forked processes and wait until all of them are finished.
+    Inside a daemon process (e.g. a worker of a process pool) no child processes can be started, 
+    the functions are called one after another instead
+
+    Parameters
+    ----------
+    functions : list
+        functions without arguments
+    parallel : Boolean
+        If False, the functions are called one after another in the current process
+    """
+    import multiprocessing
+    import ROOT
+
+    if not parallel or len(functions) <= 1 or multiprocessing.current_process().daemon:
+        for function in functions:
+            function()
+        return
+
+    def target(function):
+        function()
+        # the child process ends without cleanup, flush the output of the c++ code
+        ROOT.std.cout.flush()
+
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=target, args=(function,)) for function in functions]
+
+    for process in processes:
+        process.start()
+
+    for process in processes:
+        process.join()
+        if process.exitcode != 0:
+            print("WARNING:  === Process {0} finished with exit code {1}".format(process.name, process.exitcode))
+
+# ------------------------------------------------------------------------------
+def get_measurement_ranges(
+    nLumisections, luminosities=None, zcounts=None, 
+    lumiPerMeasurement=20, lsPerMeasurement=100, 
+    threshold = 0.02
+):
+    """
+    split a sequence of lumisections into measurements, computed from the cumulative luminosity 
+    in one go over the arrays. Returns the index ranges (begin, end) of the measurements 
+    and a boolean array with the lumisections that are used, the lumisections of a measurement are the 
+    selected ones in its range. The sequence can be a run or the concatenated lumisections of a fill or a year.
+    It can be run in two modes: 
+    - If the parameter `luminosities` is not specified, the number of lsPerMeasurement is taken as criteria
+    - If the parameter `luminosities` is specified, the amount of lumiPerMeasurement is taken as criteria
+    If the remaining luminosity (or number of lumisections) is too low for two measurements, it is merged into one.
+
+    Parameters
+    ----------
+    nLumisections : int
+        The number of lumisections that are going to be processed
+    luminosities : array, optional
+        The luminosity in \pb for each lumisection. 
+    zcounts : array, optional
+        The z boson counts for each lumisection.     
+    lumiPerMeasurement : float, optional
+        The amount of luminosity in \pb required for a measurement
+    lsPerMeasurement : int, optional
+        The number of lumisections required for a measurement
+    threshold : float, optional
+        If the luminosity in one lumisection is above this value and the number z counts is zero, the ls is skipped 
+    """
+    import numpy as np
+
+    ranges = []
+
+    if luminosities is None or len(luminosities) == 0:
+        begin = 0
+        while begin < nLumisections:
+            # merge data to one measuement if remaining number of lumisections is too less for two measuements
+            end = nLumisections if nLumisections - begin < 1.5 * lsPerMeasurement else begin + lsPerMeasurement
+            ranges.append((begin, end))
+            begin = end
+
+        return ranges, np.ones(nLumisections, dtype=bool)
+
+    luminosities = np.asarray(luminosities, dtype=np.float64)
+
+    if zcounts is not None and len(zcounts) > 0:
+        # consider lumisections where we would expect to have at least any z count 
+        #   (for lumi > 0.01 /pb we expect 0.01*500 = 5 Z bosons, the probability to find 0 is < 1%)
+        #   (for lumi > 0.02 /pb we expect 0.02*500 = 10 Z bosons, the probability to find 0 is < 0.01%)
+        # sort out lumisections without any Z candidate (maybe trigger was off)
+        selected = ~((luminosities > threshold) & (np.asarray(zcounts) == 0))
+    else:
+        selected = np.ones(nLumisections, dtype=bool)
+
+    weights = np.where(selected, luminosities, 0.)
+
+    # luminosity from each lumisection to the end, including the ones that are sorted out
+    remaining = np.cumsum(luminosities[::-1])[::-1]
+    # luminosity of the selected lumisections up to and including each lumisection
+    collected = np.cumsum(weights)
+
+    # the cumulative sums are summed up in a different order than the luminosity of a single measurement, 
+    #   close to the boundaries the sums are computed again in the order of the lumisections to get identical splits
+    tolerance = 1e-9 * lumiPerMeasurement
+
+    begin = 0
+    while begin < nLumisections:
+        # merge data to one measuement if remaining luminosity is too less for two measuements
+        remaining_ = remaining[begin]
+        if abs(remaining_ - 1.5 * lumiPerMeasurement) < tolerance:
+            remaining_ = sum(luminosities[begin:].tolist())
+
+        if remaining_ < 1.5 * lumiPerMeasurement:
+            end = nLumisections
+        else:
+            # first lumisection with which enough luminosity is collected
+            offset = collected[begin - 1] if begin > 0 else 0.
+            end = int(np.searchsorted(collected, offset + lumiPerMeasurement - tolerance, side='left'))
+            reached = np.flatnonzero(np.cumsum(weights[begin:end + 8]) >= lumiPerMeasurement)
+            if len(reached) == 0:
+                reached = np.flatnonzero(np.cumsum(weights[begin:]) >= lumiPerMeasurement)
+            end = begin + int(reached[0]) + 1 if len(reached) > 0 else nLumisections
+
+        ranges.append((begin, end))
+        begin = end
+
+    return ranges, selected
+
 # ------------------------------------------------------------------------------
 def get_ls_for_next_measurement(
     lumisections, luminosities=None, zcounts=None, 
@@ -159,7 +747,7 @@ def get_ls_for_next_measurement(
     """
     generator that takes the set of lumisections that are process 
     and yields slizes of lists of these lumisections 
-    that should be used in the next measurement. 
+    that should be used in the next measurement, see `get_measurement_ranges`. 
     It can be run in two modes: 
     - If the parameter `luminosities` is not specified, the number of lsPerMeasurement is taken as criteria
     - If the parameter `luminosities` is specified, the amount of lumiPerMeasurementis taken as criteria
@@ -179,59 +767,70 @@ def get_ls_for_next_measurement(
     threshold : float, optional
         If the luminosity in one lumisection is above this value and the number z counts is zero, the ls is skipped 
     """
+    import numpy as np
     
-    
-    
-    if luminosities:
+    if luminosities is not None and len(luminosities) > 0:
         # make measurement based on number of lumisections
         if len(lumisections) != len(luminosities):
             print("ERROR:  === Same length of lumisections and luminosities is required!")
         
-    while len(lumisections) > 0:
-        
-        # merge data to one measuement if remaining luminosity is too less for two measuements
-        if luminosities:
-            mergeMeasurements_ = sum(luminosities) < 1.5 * lumiPerMeasurement
-        else:
-            mergeMeasurements_ = len(lumisections) < 1.5 * lsPerMeasurement        
-        
-        recLumi_ = 0
-        # produce list_good_ls_ with lumisections that are used for one measurement
-        list_good_ls_ = []
-        while len(lumisections) > 0:
-            
-            if luminosities and zcounts:
-                # consider lumisections where we would expect to have at least any z count 
-                #   (for lumi > 0.01 /pb we expect 0.01*500 = 5 Z bosons, the probability to find 0 is < 1%)
-                #   (for lumi > 0.02 /pb we expect 0.02*500 = 10 Z bosons, the probability to find 0 is < 0.01%)
-                # sort out lumisections without any Z candidate (maybe trigger was off)
-                if luminosities[0] > threshold and zcounts[0] == 0:
-                    print("WARNING:  === Zero Z boson candidates found {0}/pb while we would expect {1} -> skip lumi section {2}".format(luminosities[0], luminosities[0]*500, lumisections[0]))
-                    del lumisections[0]
-                    del luminosities[0]
-                    del zcounts[0]
-                    continue
-
-            list_good_ls_.append(lumisections[0])
-            del lumisections[0]
-            
-            if zcounts:
-                del zcounts[0]
-                
-            if luminosities:
-                recLumi_ += luminosities[0]
-                del luminosities[0]
-
-                
-                # if we have collected enough luminosity
-                if not mergeMeasurements_ and recLumi_ >= lumiPerMeasurement:
-                    break
-            else:
-                # if we have collected enough luminosity sections
-                if not mergeMeasurements_ and len(list_good_ls_) >= lsPerMeasurement:
-                    break
-                
-        yield list_good_ls_
+    ranges, selected = get_measurement_ranges(len(lumisections), luminosities=luminosities, zcounts=zcounts, 
+        lumiPerMeasurement=lumiPerMeasurement, lsPerMeasurement=lsPerMeasurement, threshold=threshold)
+
+    lumisections = np.asarray(lumisections)
+
+    for begin, end in ranges:
+        for i in begin + np.flatnonzero(~selected[begin:end]):
+            print("WARNING:  === Zero Z boson candidates found {0}/pb while we would expect {1} -> skip lumi section {2}".format(
+                luminosities[i], luminosities[i]*500, lumisections[i]))
+
+        yield lumisections[begin:end][selected[begin:end]].tolist()
+
+# ------------------------------------------------------------------------------
+def load_fit_library():
+    """
+    load the RooFit model classes and, if it is up to date, the shared library with the fit functions (lib/libZCounting.so, built with `make`). 
+    Whether the library is used is only decided in .rootlogon.C: it loads the library if it is newer than all of its sources 
+    and compiles the model classes otherwise. ROOT executes it at the start in the ZHarvester directory, 
+    for scripts started from another directory it is executed here. Returns True if the library is loaded
+    """
+    import os
+    import ROOT
+
+    directory = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    library = directory + "/lib/libZCounting.so"
+
+    if not ROOT.TClass.GetClass("RooCMSShape"):
+        workingDirectory = os.getcwd()
+        ROOT.gSystem.ChangeDirectory(directory)
+        try:
+            ROOT.gROOT.Macro(".rootlogon.C")
+        finally:
+            ROOT.gSystem.ChangeDirectory(workingDirectory)
+
+    if "libZCounting" not in ROOT.gSystem.GetLibraries():
+        if os.path.isfile(library):
+            print("WARNING: === The library {0} is older than the sources, run `make` to use it".format(library))
+        return False
+
+    print("INFO:  === loaded fit library {0}".format(library))
+    return True
+
+# ------------------------------------------------------------------------------
+def load_fit_macro():
+    """
+    load the fit functions of calculateDataEfficiency.C, from the precompiled library if it is loaded (see `load_fit_library`), 
+    otherwise the macro is compiled by cling (the RooFit model classes are then compiled in .rootlogon.C)
+    """
+    import os
+    import ROOT
+
+    if load_fit_library():
+        return
+
+    macro = os.path.dirname(os.path.dirname(os.path.realpath(__file__))) + "/calculateDataEfficiency.C"
+    print("INFO:  === load fit macro {0}".format(macro))
+    ROOT.gROOT.LoadMacro(macro)
 
 # ------------------------------------------------------------------------------
 def getCorrelationIO(hPV_data, correlationsFileName):
@@ -315,6 +914,49 @@ def writeSummaryCSV(outCSVDir, outName="Mergedcsvfile", writeByLS=True, keys=Non
         with open(outCSVDir + '/' + outName + '_perLS.csv', 'w') as file:
             df_merged.to_csv(file, index=False)
 
+# ------------------------------------------------------------------------------
+# fit results of each directory, with the modification time and size of the file they were read from
+_fitResults = {}
+
+def load_fit_results(directory):
+    """
+    load the scalar results of all fits in an output directory from the fit results file (fitResults.csv)
+    that is written by the fits, one row for each category and measurement.
+    If a fit was done more than once, the last result is taken.
+    Returns a dataframe with the index (etaRegion, measurement, category), or None if there is no fit results file
+
+    Parameters
+    ----------
+    directory : str
+        output directory of the fits
+    """
+    import os
+    import pandas as pd
+
+    fileName = directory + "/fitResults.csv"
+    if not os.path.isfile(fileName):
+        return None
+
+    # the file is read again only if it changed, e.g. after a new fit
+    stat = os.stat(fileName)
+    if fileName in _fitResults and _fitResults[fileName][0] == (stat.st_mtime, stat.st_size):
+        return _fitResults[fileName][1]
+
+    df = pd.read_csv(fileName, dtype={"category": str, "etaRegion": str})
+
+    # header lines of fits that created the file at the same time
+    if (df["category"] == "category").any():
+        df = df.loc[df["category"] != "category"]
+        for column in df.columns.drop(["category", "etaRegion"]):
+            df[column] = pd.to_numeric(df[column])
+
+    index = ["etaRegion", "measurement", "category"]
+    df = df.drop_duplicates(index, keep="last").set_index(index)
+
+    _fitResults[fileName] = ((stat.st_mtime, stat.st_size), df)
+
+    return df
+
 # ------------------------------------------------------------------------------
 def getEra(run):        
     """
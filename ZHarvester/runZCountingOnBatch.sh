@@ -1,6 +1,10 @@
 #!/bin/bash
 
 runNum=$1
+# first run after the range of runs of the job, only the run $1 if not given
+endRun=${14:-$(($runNum + 1))}
+# comma separated list of the runs of the job, all runs in the range if not given
+runs=${15:-$runNum}
 
 workdir=$2/src/ZCounting/ZHarvester
 
@@ -13,9 +17,12 @@ eval `cmsenv`
 eval `scramv1 runtime -sh`
 cd $TOP
 
-cp -r ${workdir}/Utils $TOP
-cp -r ${workdir}/.rootlogon.C $TOP
-cp ${workdir}/calculateDataEfficiency.C $TOP
+# keep the modification times, so that the libraries that were compiled at submission are used
+cp -rp ${workdir}/Utils $TOP
+cp -rp ${workdir}/.rootlogon.C $TOP
+cp -p ${workdir}/calculateDataEfficiency.C $TOP
+cp -rp ${workdir}/lib $TOP 2>/dev/null
 cp ${workdir}/ZCounting.py $TOP
+cp -r ${workdir}/python $TOP
 
-python ZCounting.py -b $runNum -e $(($runNum + 1)) --dirDQM $3 --byLsCSV $4 -o $5 --mcCorrections $6 --sigTemplates $7 --bkgTemplates $8 --ptCut $9 --mass ${10} ${11} ${12} --LumiPerMeasurement ${13}
+python ZCounting.py -b $runNum -e $endRun --dirDQM $3 --byLsCSV $4 -o $5 --mcCorrections $6 --sigTemplates $7 --bkgTemplates $8 --ptCut $9 --mass ${10} ${11} ${12} --LumiPerMeasurement ${13} --runs $runs
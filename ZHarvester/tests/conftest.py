@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the modules are imported as in the scripts, from the ZHarvester directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
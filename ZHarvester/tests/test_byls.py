@@ -0,0 +1,69 @@
+import glob
+
+import pytest
+
+from python.utils import byLS_partition_format, load_byLS_partitions, load_input_csv
+
+csvLines = [
+    "#Data tag : 22v1 , Norm tag: None",
+    "#run:fill,ls,time,beamstatus,E(GeV),delivered(/ub),recorded(/ub),avgpu,source",
+]
+for run, fill in ((355100, 7920), (355101, 7920), (355205, 7921)):
+    for ls in range(1, 6):
+        csvLines.append("{0}:{1},{2}:{2},07/01/22 10:{2:02d}:00,STABLE BEAMS,6800,{3},{4},40.0,HFOC".format(run, fill, ls, 1000000. * ls, 900000. * ls))
+csvLines.append("#Summary:")
+
+
+@pytest.fixture
+def csvFile(tmp_path):
+    fileName = tmp_path / "byLS.csv"
+    fileName.write_text("\n".join(csvLines) + "\n")
+    return str(fileName)
+
+
+def test_store_by_run(csvFile, tmp_path):
+    cacheDir = str(tmp_path / "cache")
+    byLS = load_input_csv(csvFile, beginRun=355101, cacheDir=cacheDir)
+
+    assert sorted(byLS["run"].unique().tolist()) == [355101, 355205]
+    assert byLS["recorded(/pb)"].sum() == pytest.approx(2 * 0.9 * 15)
+
+    store, = glob.glob(cacheDir + "/byLS/byLS.csv.*")
+    assert sorted(f.split("/")[-1] for f in glob.glob(store + "/*")) == ["byLS_{0}.{1}".format(run, byLS_partition_format()) for run in (355100, 355101, 355205)]
+
+    # only the files of the selected runs are read
+    assert load_byLS_partitions(store, runs=[355205])["run"].unique().tolist() == [355205]
+    cached = load_input_csv(csvFile, runs=[355100, 355205], cacheDir=cacheDir)
+    assert sorted(cached["run"].unique().tolist()) == [355100, 355205]
+    assert len(load_input_csv(csvFile, beginRun=400000, cacheDir=cacheDir)) == 0
+
+
+def test_unreadable_store_is_made_again(csvFile, tmp_path):
+    cacheDir = str(tmp_path / "cache")
+    reference = load_input_csv(csvFile, cacheDir=cacheDir)
+
+    store, = glob.glob(cacheDir + "/byLS/byLS.csv.*")
+    with open(store + "/byLS_355101." + byLS_partition_format(), "wb") as file:
+        file.write(b"not a data file")
+
+    byLS = load_input_csv(csvFile, cacheDir=cacheDir)
+    assert byLS.equals(reference)
+    assert load_byLS_partitions(store, runs=[355101]).equals(reference.loc[reference["run"] == 355101])
+
+
+def test_store_follows_file(csvFile, tmp_path):
+    cacheDir = str(tmp_path / "cache")
+    load_input_csv(csvFile, cacheDir=cacheDir)
+
+    with open(csvFile, "a") as file:
+        file.write("355300:7922,1:1,07/02/22 10:00:00,STABLE BEAMS,6800,1000000.,900000.,40.0,HFOC\n")
+
+    assert 355300 in load_input_csv(csvFile, cacheDir=cacheDir)["run"].values
+    assert len(glob.glob(cacheDir + "/byLS/byLS.csv.*")) == 2
+
+
+def test_no_cache_by_default(csvFile, tmp_path):
+    byLS = load_input_csv(csvFile, runs=[355205])
+
+    assert byLS["run"].unique().tolist() == [355205]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["byLS.csv"]
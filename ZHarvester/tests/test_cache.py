@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+
+from python.cache import load_cube
+
+
+class Builder:
+    """builds a cube and counts the calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"h_mass": np.full((3, 4), float(self.calls))}
+
+
+def touch(fileName, content, mtime):
+    with open(fileName, "w") as file:
+        file.write(content)
+    os.utime(fileName, (mtime, mtime))
+
+
+def test_cube_cache(tmp_path):
+    inputFile = str(tmp_path / "DQM_Run355100.root")
+    cacheDir = str(tmp_path / "cache")
+    touch(inputFile, "trees", 1e9)
+    build = Builder()
+
+    cube = load_cube(inputFile, build, cacheDir=cacheDir, mass=[60, 120, 120])
+    assert build.calls == 1
+    np.testing.assert_array_equal(load_cube(inputFile, build, cacheDir=cacheDir, mass=[60, 120, 120])["h_mass"], cube["h_mass"])
+    assert build.calls == 1
+
+    # a different configuration or a changed input file leads to a new cube
+    load_cube(inputFile, build, cacheDir=cacheDir, mass=[60, 120, 60])
+    assert build.calls == 2
+    touch(inputFile, "trees", 1e9 + 10)
+    assert load_cube(inputFile, build, cacheDir=cacheDir, mass=[60, 120, 120])["h_mass"][0, 0] == 3.
+    touch(inputFile, "more trees", 1e9 + 10)
+    load_cube(inputFile, build, cacheDir=cacheDir, mass=[60, 120, 120])
+    assert build.calls == 4
+
+    # without cache directory the cube is always built
+    load_cube(inputFile, build)
+    assert build.calls == 5
+    assert not [name for name in os.listdir(cacheDir) if ".tmp" in name]
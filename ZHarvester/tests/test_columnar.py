@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from python.utils import count_by_ls, find_bin, histogram_by_ls
+
+
+def find_fix_bin(x, nBins, xMin, xMax):
+    """scalar TAxis::FindFixBin"""
+    if x < xMin:
+        return 0
+    if not x < xMax:
+        return nBins + 1
+    return 1 + int(nBins * (x - xMin) / (xMax - xMin))
+
+
+def draw_by_ls(lumiBlocks, values, lumisections, nBins, xMin, xMax, selection):
+    """one histogram per lumisection, filled entry by entry as TTree::Draw("x>>+h", "lumiBlock==N && ...") does"""
+    hists = np.zeros((len(lumisections), nBins+2))
+    for i, ls in enumerate(lumisections):
+        for lumiBlock, value, selected in zip(lumiBlocks, values, selection):
+            if lumiBlock == ls and selected:
+                hists[i, find_fix_bin(value, nBins, xMin, xMax)] += 1
+    return hists
+
+
+@pytest.fixture
+def tree():
+    rng = np.random.default_rng(1)
+    n = 2000
+    mass = rng.uniform(55., 125., n)
+    # values on the bin edges and the boundaries of the range
+    mass[:5] = [60., 120., 61.5, 119.99999999999999, 59.99999999999999]
+    return {
+        "lumiBlock": rng.integers(1, 30, n),
+        "mass": mass,
+        "ptTag": rng.uniform(20., 50., n),
+        "ptProbe": rng.uniform(20., 50., n),
+        "pass": rng.integers(0, 3, n),
+    }
+
+
+def test_find_bin_matches_find_fix_bin(tree):
+    expected = [find_fix_bin(x, 120, 60., 120.) for x in tree["mass"]]
+    assert find_bin(tree["mass"], 120, 60., 120.).tolist() == expected
+
+
+def test_histogram_by_ls_matches_draw(tree):
+    # lumisections 0 and 30 have no entries, 5 is missing from the list
+    lumisections = [0, 1, 2, 3, 4, 6, 10, 29, 30]
+    selection = (tree["mass"] >= 60.) & (tree["mass"] < 120.) & (tree["ptTag"] > 27.) & (tree["ptProbe"] > 27.) & (tree["pass"] == 2)
+
+    columnar = histogram_by_ls(tree["lumiBlock"], tree["mass"], lumisections, 120, 60., 120., selection=selection)
+    reference = draw_by_ls(tree["lumiBlock"], tree["mass"], lumisections, 120, 60., 120., selection)
+
+    np.testing.assert_array_equal(columnar, reference)
+
+
+def test_measurement_sum_matches_draw(tree):
+    # the histograms of a measurement are the sum of the rows of its lumisections, as in ZCounting.py
+    everything = np.ones(len(tree["mass"]), dtype=bool)
+    cube = histogram_by_ls(tree["lumiBlock"], tree["mass"], np.arange(30), 120, 60., 120., selection=everything)
+
+    for goodLSlist in ([3, 4, 5, 17], [28, 29, 31], []):
+        rows = np.asarray(goodLSlist, dtype=np.int64)
+        rows = rows[rows < len(cube)]
+        reference = draw_by_ls(tree["lumiBlock"], tree["mass"], goodLSlist, 120, 60., 120., everything).sum(axis=0)
+
+        np.testing.assert_array_equal(cube[rows].sum(axis=0), reference)
+
+
+def test_empty_lumisections(tree):
+    assert histogram_by_ls(tree["lumiBlock"], tree["mass"], [], 120, 60., 120.).shape == (0, 122)
+    assert len(count_by_ls(tree["lumiBlock"], [])) == 0
+
+
+def test_count_by_ls(tree):
+    lumisections = [1, 2, 7, 40]
+    expected = [(tree["lumiBlock"] == ls).sum() for ls in lumisections]
+    assert count_by_ls(tree["lumiBlock"], lumisections).tolist() == expected
+
+
+def test_fill_histograms_by_ls_matches_tree_draw(tree, tmp_path):
+    ROOT = pytest.importorskip("ROOT")
+    from ZCounting import fill_histograms_by_ls
+
+    fileName = str(tmp_path / "dqm.root")
+    columns = {name: values.astype(np.float64) for name, values in tree.items()}
+    columns["nPV"] = (np.arange(len(tree["mass"])) % 60).astype(np.float64)
+    options = ROOT.RDF.RSnapshotOptions()
+    options.fMode = "UPDATE"
+    for treeName in ("HLT", "Sel", "Glo", "Sta"):
+        ROOT.RDF.MakeNumpyDataFrame(columns).Snapshot(treeName, fileName, list(columns), options)
+
+    hists = fill_histograms_by_ls(fileName, 60, 120, 120, 27., 0.5, 74.5, 74)
+
+    file_ = ROOT.TFile(fileName, "READ")
+    tHLT = file_.Get("HLT")
+    acceptance = " && mass>=60 && mass<120 && ptTag > 27.0 && ptProbe > 27.0"
+    for ls in (1, 7, 29):
+        h = ROOT.TH1D("h_draw", "", 120, 60, 120)
+        tHLT.Draw("mass>>+h_draw", "pass==2 && lumiBlock=={0} {1}".format(ls, acceptance), "goff")
+        draw = np.array([h.GetBinContent(i) for i in range(122)])
+        np.testing.assert_array_equal(hists["h_mass_2HLT_Z"][ls], draw)
+        h.Delete()
+    file_.Close()
@@ -0,0 +1,151 @@
+import os
+
+import pytest
+
+from python.condor import fit_cost_model, parse_user_log, predict_wall_time, retry_factors, update_jobstats
+
+# user log of a submission with four jobs: 
+#   0 finished, 1 held for exceeding its memory, 2 failed at its runtime limit (date format of older HTCondor versions), 3 never started
+userLog = """000 (1234.000.000) 2022-10-18 13:00:00 Job submitted from host: <127.0.0.1:9618>
+...
+000 (1234.001.000) 2022-10-18 13:00:00 Job submitted from host: <127.0.0.1:9618>
+...
+000 (1234.002.000) 2022-10-18 13:00:00 Job submitted from host: <127.0.0.1:9618>
+...
+000 (1234.003.000) 2022-10-18 13:00:00 Job submitted from host: <127.0.0.1:9618>
+...
+001 (1234.000.000) 2022-10-18 13:01:00 Job executing on host: <127.0.0.2:9618>
+...
+001 (1234.001.000) 2022-10-18 13:02:00 Job executing on host: <127.0.0.3:9618>
+...
+001 (1234.002.000) 10/18 13:02:00 Job executing on host: <127.0.0.4:9618>
+...
+006 (1234.000.000) 2022-10-18 13:06:00 Image size of job updated: 200000
+	1500  -  MemoryUsage of job (MB)
+	1400000  -  ResidentSetSize of job (KB)
+...
+006 (1234.001.000) 2022-10-18 13:07:00 Image size of job updated: 300000
+	2100  -  MemoryUsage of job (MB)
+	2150400  -  ResidentSetSize of job (KB)
+...
+012 (1234.001.000) 2022-10-18 13:12:00 Job was held.
+	Error from slot1@host: Job has gone over memory limit of 2048 megabytes.
+	Code 34 Subcode 0
+...
+005 (1234.000.000) 2022-10-18 13:31:00 Job terminated.
+	(1) Normal termination (return value 0)
+		Usr 0 00:20:00, Sys 0 00:00:10  -  Run Remote Usage
+	Partitionable Resources :    Usage  Request Allocated
+	   Cpus                 :                 1         1
+	   Memory (MB)          :  1600      1999      2048
+...
+005 (1234.002.000) 10/18 13:19:00 Job terminated.
+	(1) Normal termination (return value 1)
+	Partitionable Resources :    Usage  Request Allocated
+	   Memory (MB)          :   800      1999      2048
+...
+"""
+
+features = {
+    "355100": {"nLS": 100, "recLumi": 20., "nMeasurements": 1},
+    "355101": {"nLS": 50, "recLumi": 10., "nMeasurements": 1},
+    "355205": {"nLS": 800, "recLumi": 150., "nMeasurements": 8},
+    "355300": {"nLS": 300, "recLumi": 60., "nMeasurements": 3},
+    "355400": {"nLS": 10, "recLumi": 1., "nMeasurements": 1},
+}
+
+
+@pytest.fixture
+def submission(tmp_path, monkeypatch):
+    # the user log is read from condor/TAG.log in the working directory
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("condor")
+    with open("condor/t1.log", "w") as file:
+        file.write(userLog)
+
+    return {
+        "tag": "t1",
+        "clusterId": 1234,
+        "runs": [355100, 355101, 355205, 355300, 355400],
+        "jobs": [[355100, 355101], [355205], [355300], [355400]],
+        "features": features,
+        "resources": [[1999, 10799], [1999, 10799], [1999, 1000], [1999, 10799]],
+    }
+
+
+def test_parse_user_log(submission):
+    jobs = parse_user_log("condor/t1.log")
+
+    assert jobs[0]["wallTime"] == 30 * 60
+    assert jobs[0]["peakMemory"] == 1600
+    assert jobs[0]["returnValue"] == 0
+    assert jobs[0]["reason"] is None
+
+    assert jobs[1]["wallTime"] == 10 * 60
+    assert jobs[1]["peakMemory"] == 2100
+    assert "memory limit" in jobs[1]["reason"]
+
+    assert jobs[2]["wallTime"] == 17 * 60
+    assert jobs[2]["returnValue"] == 1
+
+    assert jobs[3]["start"] is None
+    assert parse_user_log("condor/missing.log") == {}
+
+
+def test_update_jobstats(submission):
+    jobstats = update_jobstats({"runs": {}, "jobs": []}, submission, [True, False, False, False])
+
+    assert [record["status"] for record in jobstats["jobs"]] == ["done", "failed", "failed", "pending"]
+    assert [record["cause"] for record in jobstats["jobs"]] == [None, "memory", "runtime", None]
+    assert jobstats["jobs"][0]["nLS"] == 150
+    assert jobstats["jobs"][0]["maxLS"] == 100
+    assert jobstats["jobs"][0]["wallTime"] == 30 * 60
+
+    # the attempt of a job that did not run does not count
+    assert "355400" not in jobstats["runs"]
+    assert jobstats["runs"]["355205"]["attempts"] == 1
+    # the cost of a job with several runs is not copied to each run
+    assert "wallTime" not in jobstats["runs"]["355100"]
+    assert jobstats["runs"]["355101"]["job"] == ["t1", 0]
+
+    assert retry_factors(jobstats, 355100) == (1., 1.)
+    assert retry_factors(jobstats, 355205) == (2., 1.)
+    assert retry_factors(jobstats, 355300) == (1., 2.)
+    assert retry_factors(jobstats, 400000) == (1., 1.)
+
+    # the same submission again replaces its jobs
+    jobstats = update_jobstats(jobstats, submission, [True, False, False, False])
+    assert len(jobstats["jobs"]) == 4
+    assert retry_factors(jobstats, 355205) == (2., 1.)
+
+    # a resubmission that fails again by exceeding the memory doubles the factor again
+    with open("condor/t2.log", "w") as file:
+        file.write(userLog.replace("1234.001.000", "1235.000.000"))
+    resubmission = {"tag": "t2", "clusterId": 1235, "runs": [355205], "features": features, "resources": [[3998, 10799]]}
+    jobstats = update_jobstats(jobstats, resubmission, [False])
+
+    assert jobstats["runs"]["355205"]["attempts"] == 2
+    assert retry_factors(jobstats, 355205) == (4., 1.)
+
+
+def test_fit_cost_model():
+    jobs = []
+    for nLS, recLumi, nMeasurements in ((100, 20., 1), (50, 10., 1), (800, 150., 8), (300, 60., 3), (400, 40., 2), (1000, 100., 5)):
+        jobs.append({"status": "done", "nLS": nLS, "recLumi": recLumi, "nMeasurements": nMeasurements, "maxLS": nLS, 
+            "wallTime": 60. + 0.5 * nLS + 120. * nMeasurements, "peakMemory": 500. + 1.5 * nLS})
+
+    assert fit_cost_model({"runs": {}, "jobs": jobs[:4]}) is None
+    assert fit_cost_model({"runs": {}, "jobs": jobs[:4] + [dict(jobs[5], status="failed")]}) is None
+
+    model = fit_cost_model({"runs": {}, "jobs": jobs})
+    assert model["nJobs"] == 6
+    assert model["wallTime"] == pytest.approx([60., 0.5, 0., 120.], abs=1e-6)
+    assert model["peakMemory"] == pytest.approx([500., 1.5])
+    assert predict_wall_time(model, 200, 30., 2) == pytest.approx(60. + 100. + 240.)
+
+    # the coefficients are constrained to be positive
+    for job in jobs:
+        job["wallTime"] = 1000. - 2. * job["recLumi"] + 0.1 * job["nLS"]
+    model = fit_cost_model({"runs": {}, "jobs": jobs})
+    assert min(model["wallTime"]) >= 0
+    assert model["wallTime"][2] == 0
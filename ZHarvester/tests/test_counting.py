@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from python.counting import fast_results, fit_histogram, hlt_correlation, signal_shape
+
+# mass range and binning as in ZCounting.py
+edges = np.linspace(60., 120., 121)
+centers = 0.5 * (edges[1:] + edges[:-1])
+
+
+class Hist:
+    """minimal stand-in for a TH1 with the interface used by python/counting.py"""
+
+    def __init__(self, contents, edges):
+        self.contents = np.asarray(contents, dtype=np.float64)
+        self.edges = edges
+
+    def GetNbinsX(self):
+        return len(self.contents)
+
+    def GetBinContent(self, i):
+        return self.contents[i-1]
+
+    def GetXaxis(self):
+        return self
+
+    def GetBinLowEdge(self, i):
+        return self.edges[i-1]
+
+
+def toy(nsig, nbkg, slope=-0.03, resolution=1.5, template=None, templateEdges=None, seed=None):
+    """expected bin contents of signal plus exponential background, with Poisson fluctuations if a seed is given"""
+    background = np.exp(slope * centers)
+    mu = nsig * signal_shape(edges, resolution, template, templateEdges) + nbkg * background / background.sum()
+    if seed is None:
+        return mu
+    return np.random.default_rng(seed).poisson(mu).astype(np.float64)
+
+
+def test_fit_asimov_breit_wigner():
+    nsig, nbkg, chi2 = fit_histogram(toy(10000., 3000.), edges)
+
+    assert nsig.nominal_value == pytest.approx(10000., rel=1e-3)
+    assert nbkg.nominal_value == pytest.approx(3000., rel=1e-2)
+    assert chi2 < 0.01
+
+
+def test_fit_counts_signal_outside_of_window():
+    # with a wide resolution a sizable part of the signal is outside of 76-106 GeV, it must still be counted
+    contents = toy(5000., 500., resolution=3.)
+    nsig = fit_histogram(contents, edges)[0]
+
+    inWindow = (edges[:-1] >= 76.) & (edges[1:] <= 106.)
+    assert 5000. * signal_shape(edges, 3.)[inWindow].sum() < 4900.
+    assert nsig.nominal_value == pytest.approx(5000., rel=2e-3)
+
+
+def test_fit_asimov_template():
+    # asymmetric template with a radiative tail, on the extended range used by load_templates
+    templateEdges = np.linspace(50., 130., 161)
+    m = 0.5 * (templateEdges[1:] + templateEdges[:-1])
+    template = 1. / ((m - 91.19)**2 + 1.56) + 0.02 * np.exp(0.1 * (m - 91.19)) * (m < 91.19)
+
+    contents = toy(8000., 1000., resolution=1., template=template, templateEdges=templateEdges)
+    nsig, nbkg, chi2 = fit_histogram(contents, edges, template, templateEdges)
+
+    assert nsig.nominal_value == pytest.approx(8000., rel=1e-3)
+    assert nbkg.nominal_value == pytest.approx(1000., rel=1e-2)
+
+
+def test_fit_poisson_toys_unbiased():
+    pulls = []
+    for seed in range(20):
+        nsig = fit_histogram(toy(2000., 1000., seed=seed), edges)[0]
+        pulls.append((nsig.nominal_value - 2000.) / nsig.std_dev)
+
+    # the mean of 20 pulls has a spread of about 0.22
+    assert abs(np.mean(pulls)) < 0.75
+    assert 0.5 < np.std(pulls) < 1.5
+
+
+def test_fit_empty_histogram():
+    nsig, nbkg, chi2 = fit_histogram(np.zeros(len(centers)), edges)
+
+    assert nsig.nominal_value == 0
+    assert nbkg.nominal_value == 0
+
+
+def test_hlt_correlation():
+    eff, cHLT, nz = 0.9, 1.02, 1000.
+    npvEdges = np.linspace(0., 10., 11)
+    weights = np.linspace(1., 2., 10)
+
+    templates = {
+        "hPV": np.ones(10),
+        "npv_HLT2": nz * cHLT * eff**2 * weights,
+        "npv_HLT1": nz * 2 * eff * (1 - cHLT * eff) * weights,
+        "npv_HLT0": nz * (1 - 2 * eff + cHLT * eff**2) * weights,
+    }
+
+    assert hlt_correlation(templates, Hist(np.full(10, 3.), npvEdges)) == pytest.approx(cHLT)
+    assert hlt_correlation(None, Hist(np.ones(10), npvEdges)) == 1.
+    assert hlt_correlation(templates, Hist(np.ones(5), npvEdges[:6])) == 1.
+
+
+def test_fast_results_closed_form():
+    nz, effHLT, effSel, effGlo, effSta, cIO = 20000., 0.9, 0.95, 0.98, 0.97, 1.01
+
+    # the HLT correlation factor is 1 without templates
+    n2 = nz * effHLT**2
+    n1 = nz * 2 * effHLT * (1 - effHLT)
+
+    hists = [Hist(toy(n2, 500.), edges), Hist(toy(n1, 500.), edges)]
+    for eff in (effSel, effGlo, effSta):
+        hists += [Hist(toy(nz * eff, 300.), edges), Hist(toy(nz * (1 - eff), 300.), edges)]
+
+    res = fast_results(*hists, cIO)
+
+    assert res["cHLT"] == 1.
+    assert res["effHLT"].nominal_value == pytest.approx(effHLT, rel=1e-3)
+    assert res["zReco"].nominal_value == pytest.approx(nz, rel=1e-3)
+    for name, eff in (("Sel", effSel), ("Glo", effGlo), ("Sta", effSta)):
+        assert res["eff"+name].nominal_value == pytest.approx(eff, rel=1e-3)
+    assert res["zDel"].nominal_value == pytest.approx(nz * cIO**2 / (effSel * effGlo * effSta)**2, rel=5e-3)
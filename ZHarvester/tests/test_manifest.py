@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+
+from python.manifest import fit_code_identity, manifest_unchanged, measurement_manifest, update_manifest
+
+
+def touch(fileName, content, mtime):
+    with open(fileName, "w") as file:
+        file.write(content)
+    os.utime(fileName, (mtime, mtime))
+
+
+def test_manifest(tmp_path):
+    inputFile = str(tmp_path / "DQM_Run355100.root")
+    directory = str(tmp_path)
+    touch(inputFile, "trees", 1e9)
+    byLS = pd.DataFrame({"run": [355100] * 4, "ls": [1, 2, 3, 4], "recorded(/pb)": [0.1, 0.1, 0.1, 0.1]})
+    config = {"sigModel": 2, "bkgModel": 6, "mass": [60, 120, 120]}
+
+    entry = measurement_manifest([inputFile], byLS, config)
+    assert not manifest_unchanged(directory, 0, entry)
+    update_manifest(directory, 0, entry)
+    assert manifest_unchanged(directory, 0, entry)
+    assert not manifest_unchanged(directory, 1, entry)
+
+    # the luminosity does not enter, the lumisections, the configuration and the input files do
+    assert manifest_unchanged(directory, 0, measurement_manifest([inputFile], byLS.assign(**{"recorded(/pb)": 0.2}), config))
+    assert not manifest_unchanged(directory, 0, measurement_manifest([inputFile], byLS.iloc[:3], config))
+    assert not manifest_unchanged(directory, 0, measurement_manifest([inputFile], byLS, dict(config, bkgModel=5)))
+    touch(inputFile, "new trees", 1e9 + 10)
+    assert not manifest_unchanged(directory, 0, measurement_manifest([inputFile], byLS, config))
+
+    # an unreadable manifest leads to new fits
+    with open(directory + "/manifest.json", "w") as file:
+        file.write("{")
+    assert not manifest_unchanged(directory, 0, entry)
+
+
+def test_fit_code_identity():
+    identity = fit_code_identity()
+
+    files = [source["file"] for source in identity["sources"]]
+    assert files[0].endswith("/calculateDataEfficiency.C")
+    assert any(f.endswith("/Utils/RooCMSShape.cc") for f in files)
+    assert any(f.endswith("/Utils/RooCMSShape.h") for f in files)
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from python.utils import get_ls_for_next_measurement, get_measurement_ranges
+
+
+def split_one_by_one(lumisections, luminosities, zcounts, lumiPerMeasurement, threshold=0.02):
+    """split as in the first version of get_ls_for_next_measurement, one lumisection after another"""
+    lumisections, luminosities, zcounts = list(lumisections), list(luminosities), list(zcounts)
+    while len(lumisections) > 0:
+        merge = sum(luminosities) < 1.5 * lumiPerMeasurement
+        recLumi = 0
+        measurement = []
+        while len(lumisections) > 0:
+            if luminosities[0] > threshold and zcounts[0] == 0:
+                del lumisections[0], luminosities[0], zcounts[0]
+                continue
+            measurement.append(lumisections[0])
+            recLumi += luminosities[0]
+            del lumisections[0], luminosities[0], zcounts[0]
+            if not merge and recLumi >= lumiPerMeasurement:
+                break
+        yield measurement
+
+
+def split(lumisections, luminosities, zcounts, lumiPerMeasurement):
+    return list(get_ls_for_next_measurement(lumisections=list(lumisections), luminosities=list(luminosities), 
+        zcounts=list(zcounts), lumiPerMeasurement=lumiPerMeasurement))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_identical_splits_random(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 1500))
+    luminosities = rng.uniform(0., 0.12, n).tolist()
+    zcounts = rng.poisson(np.array(luminosities) * 300.).tolist()
+    lumisections = list(range(1, n+1))
+
+    assert split(lumisections, luminosities, zcounts, 20.) == list(split_one_by_one(lumisections, luminosities, zcounts, 20.))
+
+
+@pytest.mark.parametrize("lumi,lumiPerMeasurement", [(0.1, 2.), (0.1, 3.), (0.3, 0.9), (0.07, 1.4), (0.01, 0.3)])
+def test_identical_splits_at_boundaries(lumi, lumiPerMeasurement):
+    # equal luminosities, the cumulative sums hit the boundaries up to rounding
+    n = 500
+    lumisections = list(range(1, n+1))
+    luminosities = [lumi] * n
+    zcounts = [10] * n
+
+    assert split(lumisections, luminosities, zcounts, lumiPerMeasurement) == list(split_one_by_one(lumisections, luminosities, zcounts, lumiPerMeasurement))
+
+
+def test_skipped_lumisections():
+    luminosities = [1.] * 30
+    zcounts = [5] * 30
+    zcounts[9] = 0
+    zcounts[10] = 0
+    zcounts[29] = 0
+
+    measurements = split(range(30), luminosities, zcounts, 10.)
+    assert measurements == list(split_one_by_one(range(30), luminosities, zcounts, 10.))
+    # the lumisections without Z candidates are sorted out
+    assert 9 not in measurements[0] and 10 not in measurements[1]
+    assert 29 not in measurements[-1]
+
+
+def test_ranges_by_number_of_lumisections():
+    ranges, selected = get_measurement_ranges(340, lsPerMeasurement=100)
+    assert ranges == [(0, 100), (100, 200), (200, 340)]
+    assert selected.all()
+    assert get_measurement_ranges(0)[0] == []
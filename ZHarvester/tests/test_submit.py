@@ -0,0 +1,19 @@
+import os
+import importlib.util
+from importlib.machinery import SourceFileLoader
+
+# the submit script has no file extension
+_loader = SourceFileLoader("submit", os.path.dirname(os.path.dirname(os.path.realpath(__file__))) + "/submit")
+submit = importlib.util.module_from_spec(importlib.util.spec_from_loader("submit", _loader))
+_loader.exec_module(submit)
+
+
+def test_pack_runs():
+    runs = [1, 2, 3, 4, 5, 6]
+    costs = {1: 1., 2: 2., 3: 1.5, 4: 10., 5: 1., 6: 1.}
+
+    assert submit.pack_runs(runs, costs) == [[1], [2], [3], [4], [5], [6]]
+    # consecutive runs up to the cost per job, a run above it gets its own job
+    assert submit.pack_runs(runs, costs, costPerJob=3.) == [[1, 2], [3], [4], [5, 6]]
+    assert submit.pack_runs(runs, costs, costPerJob=100.) == [runs]
+    assert submit.pack_runs([], costs, costPerJob=3.) == []